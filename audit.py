@@ -0,0 +1,76 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import qoplots
+from colourCore import rBlind, severityRamps, severityFraction, percentSeverity
+from colourDifference import rgbToLab, minPairwiseDeltaE
+from catalogue import selectSchemes, streamChunks, writeReport
+
+## -- Scheme Audit
+
+accentNames = qoplots.colourNames[2:8]
+accentSlice = slice(2, 8)
+
+def auditSchemes(names, accents, severities = (100,), types = tuple(rBlind), metric = "2000"):
+    """Minimum pairwise colour difference (CIEDE2000 by default) between the accents of each scheme, for every type and severity.
+
+    `accents` has shape (n_schemes, 6, 3). Returns one result dict per scheme.
+    """
+    accents = np.asarray(accents, dtype = np.float64)
+    # (vision, n_schemes, 6, 3) with normal vision first
+    conditions = [("normal", 0)] + [(t, p) for t in types for p in severities]
+    # Each type is simulated once; its severities are blends of that one simulation
+    ramps = severityRamps(accents, types)
+    simulated = np.concatenate([accents[None]] + [ramps[t].sample(severities) for t in types])
+    dE, first, second = minPairwiseDeltaE(rgbToLab(simulated), metric)
+    results = []
+    for k, name in enumerate(names):
+        result = {"name" : name}
+        for c, (t, p) in enumerate(conditions):
+            key = t if t == "normal" else f"{t}_{severityFraction(p) * 100:g}"
+            result[key] = float(dE[c, k])
+            result[key + "_pair"] = f"{accentNames[first[c, k]]}/{accentNames[second[c, k]]}"
+        worst = int(np.argmin(dE[:, k]))
+        result["min_dE"] = float(dE[worst, k])
+        result["worst"] = conditions[worst][0] if worst == 0 else f"{conditions[worst][0]}_{severityFraction(conditions[worst][1]) * 100:g}"
+        results.append(result)
+    return results
+
+def auditCatalogue(severities = (100,), types = tuple(rBlind), workers = None, chunkSize = 16, schemes = None, metric = "2000", store = None):
+    """Audit schemes from `store` (default: colourSchemes.json) across a process pool, yielding results as chunks finish."""
+    store = qoplots.getSchemeStore(store)
+    names = selectSchemes(store, schemes)
+    rows = [store.index(name) for name in names]
+    accents = store.colours[rows, accentSlice]
+    return streamChunks(auditSchemes, (names, accents), chunkSize, workers, severities, types, metric)
+
+def rankResults(results):
+    return sorted(results, key = lambda r : r["min_dE"], reverse = True)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Rank every colour scheme by how distinguishable its accents stay under colour blindness.")
+    parser.add_argument("-o", "--out", default = "audit.csv", help = "Report path, .csv or .json")
+    parser.add_argument("-s", "--severities", nargs = "+", type = percentSeverity, default = [100], help = "Severities in percent, 0 to 100")
+    parser.add_argument("-t", "--types", nargs = "+", default = list(rBlind), choices = list(rBlind))
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "Worker processes (default: one per CPU)")
+    parser.add_argument("-m", "--metric", default = "2000", choices = ["76", "94", "2000"], help = "CIE colour difference formula")
+    parser.add_argument("--schemes", nargs = "+", help = "Only audit these schemes")
+    parser.add_argument("--store", help = "Scheme JSON or ingested palette store (.npy) to read (default: colourSchemes.json)")
+    parser.add_argument("-q", "--quiet", action = "store_true", help = "Do not print results as they arrive")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = []
+    for result in auditCatalogue(args.severities, args.types, args.workers, schemes = args.schemes, metric = args.metric, store = args.store):
+        results.append(result)
+        if not(args.quiet):
+            print(f"{len(results):4d}  {result['name']:<32}{result['min_dE']:8.2f}  {result['worst']}", file = sys.stderr)
+    results = rankResults(results)
+    writeReport(results, args.out, rank = True)
+    print(f"Audited {len(results)} schemes in {time.perf_counter() - start:.2f}s, report written to {args.out}", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qoplots
+from colourDifference import rgbToLab, deltaE, iterPairwiseDeltaE, pairwiseDeltaE
+
+## -- Vectorised all-pairs colour difference against a naive double loop
+
+def naivePairwise(lab, metric):
+    n = len(lab)
+    out = np.empty((n, n))
+    for i in range(n):
+        for j in range(n):
+            out[i, j] = deltaE(lab[i], lab[j], metric)
+    return out
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def peakMemory(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main(naiveN = 150, chunkSize = 256):
+    store = qoplots.getSchemeStore()
+    lab = rgbToLab(store.colours.reshape(-1, 3))
+    n = len(lab)
+    print(f"{n} colours from {len(store)} schemes, {n * (n - 1) // 2} distinct pairs")
+
+    print(f"\n{'metric':<8}{'naive s':>10}{'vector s':>10}{'speedup':>10}{'max diff':>10}   ({naiveN} colours)")
+    for metric in ("76", "94", "2000"):
+        naiveTime, naive = timed(lambda: naivePairwise(lab[:naiveN], metric))
+        vectorTime, vector = timed(lambda: pairwiseDeltaE(lab[:naiveN], metric = metric))
+        print(f"{metric:<8}{naiveTime:>10.3f}{vectorTime:>10.4f}{naiveTime / vectorTime:>10.0f}{np.abs(naive - vector).max():>10.1e}")
+
+    print(f"\n{'metric':<8}{'mode':<12}{'time s':>10}{'peak MB':>10}   (all {n} colours)")
+    for metric in ("76", "94", "2000"):
+        fullTime, _ = timed(lambda: pairwiseDeltaE(lab, metric = metric))
+        fullPeak = peakMemory(lambda: pairwiseDeltaE(lab, metric = metric))
+        # Reduce each block as it arrives: nearest other colour for every colour
+        def nearest():
+            best = np.empty(n)
+            for start, block in iterPairwiseDeltaE(lab, metric = metric, chunkSize = chunkSize):
+                block[np.arange(len(block)), np.arange(start, start + len(block))] = np.inf
+                best[start : start + len(block)] = block.min(axis = 1)
+            return best
+        chunkTime, _ = timed(nearest)
+        chunkPeak = peakMemory(nearest)
+        print(f"{metric:<8}{'full':<12}{fullTime:>10.3f}{fullPeak / 2 ** 20:>10.1f}")
+        print(f"{metric:<8}{f'chunk {chunkSize}':<12}{chunkTime:>10.3f}{chunkPeak / 2 ** 20:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+## -- Import time of the library modules
+## Each module is imported in a fresh interpreter under `-X importtime`. The core modules
+## must not pull in matplotlib or streamlit, and should stay within `budget` seconds.
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+modules = ["colourCache", "colourCore", "qoplots", "paletteStore", "timings", "colourDifference", "colourLUT", "sampleData", "imageSim", "schemeIndex"]
+heavy = ["matplotlib", "streamlit", "opensimplex", "cycler"]
+
+def importTime(module):
+    check = f"import sys, {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", check], cwd = root, capture_output = True, text = True, check = True)
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            total = int(fields[1]) / 1e6
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, loaded
+
+def main(budget = 0.5):
+    failed = False
+    print(f"{'module':<20}{'import s':>10}  heavy modules loaded")
+    for module in modules:
+        total, loaded = importTime(module)
+        bad = total > budget or bool(loaded)
+        failed |= bad
+        print(f"{module:<20}{total:>10.3f}  {', '.join(loaded) or '-'}{'   <-- fails' if bad else ''}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colourCore import rBlind, blindSimulate
+from colourLUT import loadLUT, simulateLUT
+
+## -- LUT accuracy and speed against the exact engine
+## Tables are built and saved on the first run, so "load s" then includes the build.
+
+def timeit(fn, repeats = 3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(n = 1_000_000, sizes = (33, 65, 256), severity = 100):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (n, 3), dtype = np.uint8)
+    print(f"{n} random 8-bit colours, severity {severity}%")
+    print(f"{'type':<6}{'engine':<10}{'load s':>10}{'sim s':>10}{'Mpx/s':>10}{'max err':>10}{'mean err':>10}")
+    for t in rBlind:
+        exactTime, exact = timeit(lambda: blindSimulate(pixels, t, severity), repeats = 1)
+        print(f"{t:<6}{'exact':<10}{'':>10}{exactTime:>10.3f}{n / exactTime / 1e6:>10.2f}{0:>10.3f}{0:>10.3f}")
+        for size in sizes:
+            start = time.perf_counter()
+            loadLUT(t, size)
+            buildTime = time.perf_counter() - start
+            lutTime, approx = timeit(lambda: simulateLUT(pixels, t, severity, size))
+            # Errors in 8-bit levels
+            err = np.abs(approx - exact) * 255
+            print(f"{t:<6}{f'lut{size}':<10}{buildTime:>10.3f}{lutTime:>10.3f}{n / lutTime / 1e6:>10.2f}{err.max():>10.3f}{err.mean():>10.3f}")
+
+if __name__ == "__main__":
+    main()
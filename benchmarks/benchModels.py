@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colourCore import rBlind
+from colourDifference import rgbToLab, deltaE2000
+from simulationModels import models, simulate
+
+## -- Simulation model speed and agreement
+## Agreement is the CIEDE2000 difference between each model's output and the others' on
+## the same colours, at full severity.
+
+def timeit(fn, repeats = 3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(n = 1_000_000, severity = 100):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (n, 3), dtype = np.uint8)
+    print(f"{n} random 8-bit colours, severity {severity}%")
+    print(f"{'type':<6}{'model':<10}{'sim s':>10}{'Mpx/s':>10}")
+    sample = pixels[:20000]
+    for t in rBlind:
+        for model in models:
+            elapsed, _ = timeit(lambda: simulate(pixels, model, t, severity), repeats = 1 if model == "meyer" else 3)
+            print(f"{t:<6}{model:<10}{elapsed:>10.3f}{n / elapsed / 1e6:>10.2f}")
+
+    print("\nMean / 95th percentile CIEDE2000 between models")
+    for t in rBlind:
+        labs = {model : rgbToLab(simulate(sample, model, t, severity)) for model in models}
+        print(f"{t:<10}" + "".join(f"{model:>16}" for model in models))
+        for first in models:
+            cells = []
+            for second in models:
+                dE = deltaE2000(labs[first], labs[second])
+                cells.append(f"{dE.mean():>9.2f} /{np.percentile(dE, 95):>5.1f}")
+            print(f"{first:<10}" + "".join(cells))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import statistics
+import subprocess
+import sys
+import time
+
+## -- Benchmark Harness
+## Cases register with @benchmark and are timed with perf_counter: each timed run is a
+## batch of calls sized so that it lasts at least `minTime`, and the result reports per
+## call statistics over `repeats` batches. Results are written as JSON and can be compared
+## with an earlier run. With profiling on, each case is also run once under cProfile (or
+## line_profiler for the functions it names, when that package is installed) and the hot
+## path report is saved next to the results.
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+resultsDirectory = os.path.join(root, "benchmarks", "results")
+
+cases = []
+
+class Case():
+    def __init__(self, fn, name, group, setup, repeats, minTime, slow, lines):
+        self.fn = fn
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.repeats = repeats
+        self.minTime = minTime
+        self.slow = slow
+        self.lines = lines
+
+    @property
+    def fullName(self):
+        return f"{self.group}.{self.name}"
+
+def benchmark(group, name = None, setup = None, repeats = 5, minTime = 0.05, slow = False, lines = ()):
+    """Register `fn(state)` as a case. `setup()` builds `state` once, outside the timings.
+
+    `slow` cases (such as full 4K images) are skipped by `--quick`; `lines` names the
+    functions to profile line by line.
+    """
+    def register(fn):
+        cases.append(Case(fn, name or fn.__name__, group, setup, repeats, minTime, slow, lines))
+        return fn
+    return register
+
+## -- Timing
+
+def callsPerBatch(fn, state, minTime):
+    # Double the batch until it lasts minTime, as timeit.autorange does
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(state)
+        elapsed = time.perf_counter() - start
+        if elapsed >= minTime or calls >= 1 << 20:
+            return calls, elapsed
+        calls *= 2
+
+def timeCase(case):
+    state = case.setup() if case.setup else None
+    calls, _ = callsPerBatch(case.fn, state, case.minTime)
+    times = []
+    for _ in range(case.repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            case.fn(state)
+        times.append((time.perf_counter() - start) / calls)
+    return {
+        "name"   : case.fullName,
+        "calls"  : calls,
+        "repeats": case.repeats,
+        "min"    : min(times),
+        "median" : statistics.median(times),
+        "mean"   : statistics.fmean(times),
+        "stdev"  : statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+## -- Profiling
+
+def profileCase(case, directory, top = 25):
+    state = case.setup() if case.setup else None
+    stem = os.path.join(directory, case.fullName)
+    profiler = cProfile.Profile()
+    profiler.runcall(case.fn, state)
+    profiler.dump_stats(stem + ".prof")
+    report = io.StringIO()
+    pstats.Stats(profiler, stream = report).sort_stats("cumulative").print_stats(top)
+    with open(stem + ".txt", "w") as reportFile:
+        reportFile.write(report.getvalue())
+    if case.lines:
+        try:
+            from line_profiler import LineProfiler
+        except ImportError:
+            return
+        lineProfiler = LineProfiler(*case.lines)
+        lineProfiler.runcall(case.fn, state)
+        with open(stem + ".lines.txt", "w") as reportFile:
+            lineProfiler.print_stats(stream = reportFile)
+
+## -- Results
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd = root, capture_output = True, text = True).stdout.strip()
+    except OSError:
+        commit = ""
+    import numpy as np
+    return {
+        "commit"   : commit,
+        "time"     : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python"   : platform.python_version(),
+        "numpy"    : np.__version__,
+        "machine"  : platform.machine(),
+        "processor": platform.processor(),
+        "cpus"     : os.cpu_count(),
+    }
+
+def saveResults(results, path = None):
+    os.makedirs(resultsDirectory, exist_ok = True)
+    env = environment()
+    if path is None:
+        path = os.path.join(resultsDirectory, f"{env['time'].replace(':', '')}-{env['commit'] or 'nogit'}.json")
+    with open(path, "w") as resultsFile:
+        json.dump({"environment" : env, "results" : results}, resultsFile, indent = 2)
+    return path
+
+def loadResults(path):
+    with open(path) as resultsFile:
+        return {r["name"] : r for r in json.load(resultsFile)["results"]}
+
+def formatTime(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit:<2}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+def run(pattern = "", quick = False, profile = False, compare = None, out = None, threshold = 1.2):
+    """Run every case whose name contains `pattern`, print a table and save the results.
+
+    With `compare`, each median is shown as a ratio to that earlier results file and the
+    return value is False if any case slowed by more than `threshold`.
+    """
+    baseline = loadResults(compare) if compare else {}
+    selected = [c for c in cases if pattern in c.fullName and not(quick and c.slow)]
+    profileDirectory = os.path.join(resultsDirectory, "profiles")
+    if profile:
+        os.makedirs(profileDirectory, exist_ok = True)
+    results = []
+    ok = True
+    print(f"{'case':<44}{'median':>12}{'min':>12}{'stdev':>12}  {'vs baseline' if baseline else ''}")
+    for case in selected:
+        result = timeCase(case)
+        results.append(result)
+        line = f"{case.fullName:<44}{formatTime(result['median']):>12}{formatTime(result['min']):>12}{formatTime(result['stdev']):>12}"
+        if case.fullName in baseline:
+            ratio = result["median"] / baseline[case.fullName]["median"]
+            slower = ratio > threshold
+            ok &= not(slower)
+            line += f"  {ratio:6.2f}x{'  <-- slower' if slower else ''}"
+        print(line, flush = True)
+        if profile:
+            profileCase(case, profileDirectory)
+    path = saveResults(results, out)
+    print(f"Results written to {path}", file = sys.stderr)
+    if profile:
+        print(f"Profiles written to {profileDirectory}", file = sys.stderr)
+    return ok
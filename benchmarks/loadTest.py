@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+## -- Load Test
+## Opens `concurrency` keep-alive connections to a running simService and sends requests
+## back to back on each for `duration` seconds, then reports throughput and latency
+## percentiles. 503 answers are counted separately, since they are the service shedding load.
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+def testImage(size = 256):
+    from matplotlib.image import imsave
+    pixels = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype = np.uint8)
+    buffer = io.BytesIO()
+    imsave(buffer, pixels, format = "png")
+    return buffer.getvalue()
+
+class Client():
+    def __init__(self, host, port, unix):
+        self.host, self.port, self.unix = host, port, unix
+        self.reader = self.writer = None
+
+    async def connect(self):
+        if self.unix:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, target, body = b"", contentType = "application/json"):
+        head = f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: {contentType}\r\nContent-Length: {len(body)}\r\n\r\n"
+        self.writer.write(head.encode("latin1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split(b" ", 2)[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        return status, body
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+def workload(kind):
+    """(method, target, body, content type) for each request of `kind`."""
+    if kind == "shift":
+        return "POST", "/shift", json.dumps({"scheme" : "twilight", "type" : "deut", "severity" : 80}).encode(), "application/json"
+    if kind == "colours":
+        colours = ["#%06X" % c for c in np.random.default_rng(0).integers(0, 1 << 24, 256).tolist()]
+        return "POST", "/shift", json.dumps({"colours" : colours, "type" : "prot", "model" : "machado"}).encode(), "application/json"
+    if kind == "lookup":
+        return "GET", "/schemes/twilight", b"", "application/json"
+    if kind == "simulate":
+        return "POST", "/simulate?type=trit", testImage(), "image/png"
+    raise ValueError(f"Unknown workload {kind}")
+
+async def worker(client, request, stopAt, latencies, counts):
+    await client.connect()
+    try:
+        while time.perf_counter() < stopAt:
+            start = time.perf_counter()
+            status, _ = await client.request(*request)
+            elapsed = time.perf_counter() - start
+            counts[status] = counts.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+            elif status == 503:
+                await asyncio.sleep(0.01)
+    finally:
+        client.close()
+
+async def loadTest(kind = "shift", concurrency = 32, duration = 10, host = "127.0.0.1", port = 8765, unix = None):
+    request = workload(kind)
+    latencies, counts = [], {}
+    start = time.perf_counter()
+    stopAt = start + duration
+    await asyncio.gather(*(worker(Client(host, port, unix), request, stopAt, latencies, counts) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "workload"   : kind,
+        "concurrency": concurrency,
+        "seconds"    : elapsed,
+        "ok"         : len(latencies),
+        "statuses"   : {str(k) : v for k, v in sorted(counts.items())},
+        "throughput" : len(latencies) / elapsed,
+        "p50"        : percentile(latencies, 50),
+        "p99"        : percentile(latencies, 99),
+        "mean"       : statistics.fmean(latencies) if latencies else float("nan"),
+    }
+
+async def waitForService(host, port, unix, timeout = 60):
+    stopAt = time.perf_counter() + timeout
+    while True:
+        client = Client(host, port, unix)
+        try:
+            await client.connect()
+            await client.request("GET", "/schemes")
+            return
+        except OSError:
+            if time.perf_counter() > stopAt:
+                raise
+            await asyncio.sleep(0.2)
+        finally:
+            client.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Load test simService and report p50/p99 latency and throughput.")
+    parser.add_argument("-k", "--kind", nargs = "+", default = ["shift"], choices = ["shift", "colours", "lookup", "simulate"])
+    parser.add_argument("-c", "--concurrency", type = int, default = 32, help = "Simultaneous keep-alive connections")
+    parser.add_argument("-d", "--duration", type = float, default = 10, help = "Seconds per workload")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--unix", help = "Connect to this Unix socket instead of TCP")
+    parser.add_argument("--spawn", action = "store_true", help = "Start a service for the duration of the test")
+    parser.add_argument("-w", "--workers", type = int, help = "Worker processes for a spawned service")
+    parser.add_argument("-o", "--out", help = "Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    service = None
+    if args.spawn:
+        command = [sys.executable, os.path.join(root, "simService.py"), "--host", args.host, "--port", str(args.port)]
+        command += ["--unix", args.unix] if args.unix else []
+        command += ["--workers", str(args.workers)] if args.workers else []
+        service = subprocess.Popen(command, cwd = root)
+    try:
+        asyncio.run(waitForService(args.host, args.port, args.unix))
+        results = []
+        print(f"{'workload':<12}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+        for kind in args.kind:
+            result = asyncio.run(loadTest(kind, args.concurrency, args.duration, args.host, args.port, args.unix))
+            results.append(result)
+            print(f"{kind:<12}{result['ok']:>10}{result['throughput']:>10.1f}{result['p50'] * 1e3:>10.2f}{result['p99'] * 1e3:>10.2f}  {result['statuses']}", flush = True)
+        if args.out:
+            with open(args.out, "w") as resultsFile:
+                json.dump(results, resultsFile, indent = 2)
+    finally:
+        if service:
+            service.terminate()
+            service.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qoplots
+from preview import linesFigure, cachedRamp
+from svgSheet import themeToSVG
+
+## -- Re-plotted Renders
+## Re-plotting the figure in shifted colours, as the app did before `preview.renderPreviews`.
+## The app no longer calls these; they are the reference the pixel path is benchmarked against.
+
+def renderLines(scheme, x, y, dpi = 300):
+    """The `linesFigure` plot as PNG bytes."""
+    fig, style = linesFigure(scheme, x, y, dpi)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format = "png", dpi = dpi, bbox_inches = "tight",
+                facecolor = style['savefig.facecolor'], edgecolor = style['savefig.edgecolor'])
+    return buffer.getvalue()
+
+def renderColumn(schemeName, t, p, x, y, dpi = 300):
+    """Swatch SVG and line plot PNG for a scheme, shifted by deficiency `t` at severity `p` unless `t` is None."""
+    scheme = list(qoplots.loadScheme(schemeName)) if t is None else cachedRamp(schemeName, t)[p].tolist()
+    return themeToSVG(scheme), renderLines(scheme, x, y, dpi)
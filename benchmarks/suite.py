@@ -0,0 +1,195 @@
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import qoplots
+from colourCore import (rgbToHex, hexToRGB, rgbToHSL, hslToRGB, blindMk, blindMkArray, blindSimulate,
+                        colourShift, shiftScheme, themeToSVG, SeverityRamp, confusionShift)
+from colourCache import clearConversionCaches
+from colourDifference import rgbToLab, deltaE2000
+from colourLUT import simulateLUT
+from simulationModels import simulate
+from svgSheet import writeCatalogue
+from timings import stage
+from harness import benchmark, run
+
+## -- Workloads
+## One colour, 10k random colours and a 3840 x 2160 8-bit image, always from the same seed.
+
+colour = (0.3, 0.6, 0.8)
+colourHex = "#4C99CC"
+imageShape = (2160, 3840, 3)
+
+def manyColours():
+    return np.random.default_rng(0).random((10_000, 3))
+
+def manyHex():
+    return [rgbToHex(tuple(col)) for col in manyColours().tolist()]
+
+def image4K():
+    return np.random.default_rng(0).integers(0, 256, imageShape, dtype = np.uint8)
+
+def twilight():
+    return list(qoplots.loadScheme("twilight"))
+
+## -- Scalar conversions
+## "warm" calls hit the conversion caches; the 10k cases clear them first, so every colour misses.
+
+@benchmark("convert", "rgbToHex.warm")
+def rgbToHexWarm(state):
+    rgbToHex(colour)
+
+@benchmark("convert", "rgbToHex.10k", setup = manyColours)
+def rgbToHex10k(cols):
+    clearConversionCaches()
+    for col in cols.tolist():
+        rgbToHex(col)
+
+@benchmark("convert", "hexToRGB.10k", setup = manyHex)
+def hexToRGB10k(hexes):
+    clearConversionCaches()
+    for col in hexes:
+        hexToRGB(col)
+
+@benchmark("convert", "rgbToHSL.10k", setup = manyColours)
+def rgbToHSL10k(cols):
+    clearConversionCaches()
+    for col in cols.tolist():
+        rgbToHSL(col)
+
+@benchmark("convert", "hslToRGB.10k", setup = manyColours)
+def hslToRGB10k(cols):
+    clearConversionCaches()
+    for col in (cols * [0.999, 1, 1]).tolist():
+        hslToRGB(col)
+
+@benchmark("convert", "lighten.warm")
+def lightenWarm(state):
+    qoplots.lighten(colourHex, 30)
+
+@benchmark("convert", "lighten.10k", setup = manyHex)
+def lighten10k(hexes):
+    clearConversionCaches()
+    for col in hexes:
+        qoplots.lighten(col, 30)
+
+@benchmark("convert", "rgbToLab.10k", setup = manyColours)
+def rgbToLab10k(cols):
+    rgbToLab(cols)
+
+@benchmark("convert", "deltaE2000.10k", setup = lambda: rgbToLab(manyColours()))
+def deltaE200010k(lab):
+    deltaE2000(lab, lab[::-1])
+
+## -- Simulation
+
+@benchmark("simulate", "blindMk.single", lines = (blindMk,))
+def blindMkSingle(state):
+    blindMk(colour, "prot")
+
+@benchmark("simulate", "colourShift.single")
+def colourShiftSingle(state):
+    colourShift(colour, "deut", 100)
+
+@benchmark("simulate", "shiftScheme", setup = twilight)
+def shiftSchemeTwilight(scheme):
+    shiftScheme(scheme, "trit", 70)
+
+@benchmark("simulate", "blindSimulate.10k", setup = manyColours, lines = (blindMkArray, confusionShift))
+def blindSimulate10k(cols):
+    blindSimulate(cols, "prot", 100)
+
+@benchmark("simulate", "blindSimulate.4k", setup = image4K, repeats = 3, minTime = 0, slow = True)
+def blindSimulate4K(image):
+    blindSimulate(image, "prot", 100)
+
+@benchmark("simulate", "severityRamp.101x10k", setup = lambda: SeverityRamp(manyColours(), "deut"))
+def severityRamp10k(ramp):
+    ramp.sample(range(101))
+
+@benchmark("simulate", "lut65.4k", setup = image4K, repeats = 3, minTime = 0, slow = True)
+def lut4K(image):
+    simulateLUT(image, "prot", 100, 65)
+
+for model in ("vienot", "brettel", "machado"):
+    def modelCase(state, model = model):
+        simulate(state, model, "deut", 100)
+    benchmark("simulate", f"{model}.10k", setup = manyColours)(modelCase)
+    benchmark("simulate", f"{model}.4k", setup = image4K, repeats = 3, minTime = 0, slow = True)(modelCase)
+
+## -- Rendering
+
+@benchmark("render", "themeToSVG", setup = twilight)
+def themeToSVGTwilight(scheme):
+    themeToSVG(scheme)
+
+@benchmark("render", "svgCatalogue", repeats = 3)
+def svgCatalogue(state):
+    writeCatalogue(io.StringIO())
+
+def lines():
+    from sampleData import noiseLines
+    return noiseLines(6, 200, seed = 3)
+
+# The replot.* cases time the re-plotting path the app used to take, kept as the reference
+# for previews.pixels; the app itself is timed by app.rerun.
+
+@benchmark("render", "replot.normal", setup = lines, repeats = 3, minTime = 0)
+def replotNormal(data):
+    import replot
+    replot.renderColumn("twilight", None, 0, *data, dpi = 300)
+
+@benchmark("render", "replot.prot", setup = lines, repeats = 3, minTime = 0)
+def replotProt(data):
+    import replot
+    replot.renderColumn("twilight", "prot", 100, *data, dpi = 300)
+
+@benchmark("render", "previews.pixels", setup = lines, repeats = 3, minTime = 0)
+def previewsPixels(data):
+    # One render with every deficiency simulated from its pixels, against four replot-style renders
+    import preview
+    preview.renderPreviews("twilight", ("prot", "deut", "trit"), 100, *data, dpi = 300)
+
+def appTest():
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    import preview
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "colourBlindness.py"), AppTest, st, preview
+
+@benchmark("render", "app.rerun", setup = appTest, repeats = 3, minTime = 0, slow = True)
+def appRerun(state):
+    # A fresh session with every cache the app renders through emptied, so all four columns render
+    path, AppTest, st, preview = state
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    preview.cachedRamp.cache_clear()
+    AppTest.from_file(path, default_timeout = 300).run()
+
+## -- Instrumentation
+## The cost of a stage mark with no run recording, as left in place in production.
+
+@benchmark("timings", "stage.idle")
+def stageIdle(state):
+    with stage("idle"):
+        pass
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Time the conversion, simulation and rendering paths and save the results as JSON.")
+    parser.add_argument("-k", "--filter", default = "", help = "Only run cases whose name contains this")
+    parser.add_argument("--quick", action = "store_true", help = "Skip 4K image and full app cases")
+    parser.add_argument("--profile", action = "store_true", help = "Also save cProfile (and line_profiler, if installed) reports")
+    parser.add_argument("--compare", help = "Earlier results JSON to compare medians against")
+    parser.add_argument("--threshold", type = float, default = 1.2, help = "Slowdown ratio that counts as a regression")
+    parser.add_argument("-o", "--out", help = "Results path (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args(argv)
+    ok = run(args.filter, args.quick, args.profile, args.compare, args.out, args.threshold)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
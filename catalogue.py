@@ -0,0 +1,43 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from colourCore import rBlind
+
+## -- Catalogue Runs
+## Shared by the tools that work through every scheme or colormap: audit, paletteOptimizer,
+## svgSheet, schemeIndex and colormapAnalysis.
+
+# Normal vision first, then each deficiency
+visions = ("normal",) + tuple(rBlind)
+
+def selectSchemes(store, schemes = None):
+    """The names of `schemes` as `store` spells them, or every name in sorted order if None."""
+    return store.sortedNames if schemes is None else [store.lookup[s.lower()] for s in schemes]
+
+def streamChunks(fn, columns, chunkSize, workers = None, *args, **kwargs):
+    """Call `fn(*chunks, *args, **kwargs)` on each `chunkSize` rows of `columns` across a process pool.
+
+    `columns` are equal-length sequences sliced together. Yields every item each call returns,
+    in the order the calls finish.
+    """
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        futures = [
+            pool.submit(fn, *(column[i : i + chunkSize] for column in columns), *args, **kwargs)
+            for i in range(0, len(columns[0]), chunkSize)
+        ]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+def writeReport(results, path, rank = False):
+    """Write result dicts to `path` as JSON if it ends in .json, otherwise as CSV, numbering the rows with `rank`."""
+    if path.lower().endswith(".json"):
+        with open(path, "w") as reportFile:
+            json.dump(results, reportFile, indent = 2)
+        return
+    with open(path, "w", newline = "") as reportFile:
+        writer = csv.DictWriter(reportFile, fieldnames = (["rank"] if rank else []) + list(results[0].keys()))
+        writer.writeheader()
+        for number, result in enumerate(results, 1):
+            writer.writerow({"rank" : number, **result} if rank else result)
@@ -0,0 +1,130 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import matplotlib
+from matplotlib.colors import ListedColormap
+
+from colourCore import rBlind, percentSeverity
+from colourDifference import rgbToLab, deltaE
+from simulationModels import simulate
+from catalogue import writeReport
+
+## -- Colormap Analysis
+## Continuous colormaps are sampled along their tables and simulated under each deficiency. Along each
+## simulated map we check that lightness keeps moving one way, how evenly the colour
+## difference is spread between neighbouring samples, and how much of the total difference
+## along the map survives compared with normal vision. Many maps are stacked into one
+## array, so each deficiency is a single simulation call however many maps are checked.
+
+def getColormap(cmap):
+    return matplotlib.colormaps[cmap] if type(cmap) == str else cmap
+
+def sampleColormap(cmap, n = 256):
+    """rgb values of shape (n, 3) evenly spaced along `cmap`, a Colormap or registered name.
+
+    Colormaps look values up in a table of `cmap.N` entries (256 by default), so sampling
+    more finely only repeats entries and shows up as zero steps.
+    """
+    return getColormap(cmap)(np.linspace(0, 1, n))[:, :3]
+
+def simulateColormaps(samples, types = tuple(rBlind), severity = 100, model = "meyer"):
+    """Stack `samples` (..., 3) as seen in normal vision and each of `types`: (1 + len(types), ..., 3)."""
+    samples = np.asarray(samples, dtype = np.float64)
+    return np.stack([samples] + [simulate(samples, model, t, severity) for t in types])
+
+def simulateColormap(cmap, t, severity = 100, n = 256, model = "meyer"):
+    """`cmap` as seen with deficiency `t`, as a new ListedColormap named "<name>_<t>"."""
+    cmap = getColormap(cmap)
+    rgb = simulate(sampleColormap(cmap, n), model, t, severity)
+    return ListedColormap(np.clip(rgb, 0, 1), name = f"{cmap.name}_{t}")
+
+## -- Uniformity
+
+def lightnessReversals(L, tol = 1e-6):
+    # Times the direction of L* along the map changes, ignoring flat steps
+    dL = np.diff(L, axis = -1)
+    steps = np.where(np.abs(dL) > tol, np.sign(dL), 0)
+    count = np.zeros(L.shape[:-1], dtype = int)
+    last = np.zeros(L.shape[:-1])
+    for k in range(steps.shape[-1]):
+        step = steps[..., k]
+        count += (step != 0) & (last != 0) & (step != last)
+        last = np.where(step != 0, step, last)
+    return count
+
+def uniformityStats(lab, metric = "2000"):
+    """Lightness and local colour difference statistics along maps `lab` (..., n, 3)."""
+    L = lab[..., 0]
+    steps = deltaE(lab[..., 1:, :], lab[..., :-1, :], metric)
+    mean = steps.mean(axis = -1)
+    reversals = lightnessReversals(L)
+    return {
+        "L_monotonic" : reversals == 0,
+        "L_reversals" : reversals,
+        "L_range"     : L.max(axis = -1) - L.min(axis = -1),
+        "dE_mean"     : mean,
+        "dE_cv"       : steps.std(axis = -1) / np.where(mean > 0, mean, 1),
+        "dE_min"      : steps.min(axis = -1),
+        "dE_max"      : steps.max(axis = -1),
+        "length"      : steps.sum(axis = -1),
+    }
+
+def analyseColormaps(cmaps, n = 256, severity = 100, types = tuple(rBlind), model = "meyer", metric = "2000"):
+    """Uniformity of each colormap in `cmaps` in normal vision and each of `types`.
+
+    Returns one dict per map whose keys are "<vision>_<statistic>". "<vision>_length_ratio"
+    is the total colour difference along the map as a fraction of that in normal vision.
+    "worst_length_ratio" is the smallest of these.
+    """
+    cmaps = [getColormap(cmap) for cmap in cmaps]
+    samples = np.stack([sampleColormap(cmap, n) for cmap in cmaps])
+    lab = rgbToLab(simulateColormaps(samples, types, severity, model))
+    stats = uniformityStats(lab, metric)
+    conditions = ("normal",) + tuple(types)
+    normalLength = np.where(stats["length"][0] > 0, stats["length"][0], 1)
+    results = []
+    for k, cmap in enumerate(cmaps):
+        result = {"name" : cmap.name}
+        for v, vision in enumerate(conditions):
+            for key, values in stats.items():
+                result[f"{vision}_{key}"] = values[v, k].item()
+            result[f"{vision}_length_ratio"] = float(stats["length"][v, k] / normalLength[k])
+        result["worst_length_ratio"] = min(result[f"{t}_length_ratio"] for t in types) if types else 1.0
+        result["all_monotonic"] = all(result[f"{vision}_L_monotonic"] for vision in conditions)
+        results.append(result)
+    return results
+
+def analyseColormap(cmap, **kwargs):
+    return analyseColormaps([cmap], **kwargs)[0]
+
+def registeredColormaps(reversed = False):
+    return sorted(name for name in matplotlib.colormaps if reversed or not(name.endswith("_r")))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Check matplotlib colormaps for lightness monotonicity and uniformity under colour blindness.")
+    parser.add_argument("cmaps", nargs = "*", help = "Colormaps to check (default: every registered colormap)")
+    parser.add_argument("-o", "--out", help = "Report path, .csv or .json")
+    parser.add_argument("-n", type = int, default = 256, help = "Samples along each colormap (matplotlib tables hold 256)")
+    parser.add_argument("-s", "--severity", type = percentSeverity, default = 100, help = "Severity in percent, 0 to 100")
+    parser.add_argument("-t", "--types", nargs = "+", default = list(rBlind), choices = list(rBlind))
+    parser.add_argument("-m", "--metric", default = "2000", choices = ["76", "94", "2000"], help = "CIE colour difference formula")
+    parser.add_argument("--model", default = "meyer", choices = ["meyer", "vienot", "brettel", "machado"])
+    parser.add_argument("--reversed", action = "store_true", help = "Include the _r reversed colormaps")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cmaps = args.cmaps or registeredColormaps(args.reversed)
+    results = analyseColormaps(cmaps, args.n, args.severity, tuple(args.types), args.model, args.metric)
+    results.sort(key = lambda r : r["worst_length_ratio"], reverse = True)
+    print(f"{'colormap':<24}{'monotonic':>10}{'worst ratio':>13}" + "".join(f"{t + ' ratio':>12}" for t in args.types))
+    for result in results:
+        print(f"{result['name']:<24}{str(result['all_monotonic']):>10}{result['worst_length_ratio']:>13.2f}"
+              + "".join(f"{result[t + '_length_ratio']:>12.2f}" for t in args.types))
+    if args.out:
+        writeReport(results, args.out)
+    print(f"Analysed {len(results)} colormaps in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
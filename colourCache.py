@@ -0,0 +1,32 @@
+from functools import lru_cache, wraps
+
+## -- Conversion Caches
+
+conversionCacheSize = 4096
+cachedConversions = {}
+
+def conversionCache(fn):
+    """Memoise a colour conversion in a bounded LRU cache keyed on the colour and any extra arguments.
+
+    Colours that are not strings are keyed as tuples of floats, so lists and arrays share entries.
+    """
+    cached = lru_cache(maxsize = conversionCacheSize)(fn)
+    @wraps(fn)
+    def wrapper(col, *args):
+        if not isinstance(col, (str, tuple)):
+            try:
+                col = tuple(float(c) for c in col)
+            except (TypeError, ValueError):
+                raise TypeError(f"Could not convert colour to array. Type {type(col)}")
+        return cached(col, *args)
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    cachedConversions[f"{fn.__module__}.{fn.__name__}"] = wrapper
+    return wrapper
+
+def conversionCacheInfo():
+    return {name : fn.cache_info() for name, fn in cachedConversions.items()}
+
+def clearConversionCaches():
+    for fn in cachedConversions.values():
+        fn.cache_clear()
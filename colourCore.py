@@ -0,0 +1,327 @@
+
+import numpy as np
+
+from colourCache import conversionCache
+
+## -- Constants
+
+gamma = 2.2
+whitePoint = (0.312713, 0.329016, 0.358271)
+
+rgbToXYZMatrix = np.array([
+    [0.430574, 0.341550, 0.178325],
+    [0.222015, 0.706655, 0.071330],
+    [0.020183, 0.129553, 0.939180],
+])
+
+xyzToRGBMatrix = np.array([
+    [ 3.063218, -1.393325, -0.475802],
+    [-0.969243,  1.875966,  0.041555],
+    [ 0.067871, -0.228834,  1.069251],
+])
+
+rBlind={'prot':{'cpu':0.735,'cpv':0.265,'am':1.273463,'ayi':-0.073894},
+            'deut':{'cpu':1.14,'cpv':-0.14,'am':0.968437,'ayi':0.003331},
+            'trit':{'cpu':0.171,'cpv':-0.003,'am':0.062921,'ayi':0.292119}};
+
+
+## -- Scalar Conversions
+
+@conversionCache
+def rgbToHex(rgb):
+    colString = "#"
+    for d in rgb:
+        colString += f"{int(round(d * 255)):02X}"
+    return colString
+
+@conversionCache
+def rgbToHSL(rgb):
+    r, g, b = rgb
+    if r > 1 or g > 1 or b > 1:
+        r, g, b = r / 255, g / 255, b / 255
+        rgb = [r, g, b]
+    xmax = max(rgb)
+    xmin = min(rgb)
+    C = xmax - xmin
+    l = (xmax + xmin) / 2
+    if C == 0:
+        h = 0
+    elif xmax == r:
+        h = 60 * (g - b) / C
+    elif xmax == g:
+        h = 60 * (2 + (b - r) / C)
+    elif xmax == b:
+        h = 60 * (4 + (r - g) / C)
+    else:
+        print(f"ERROR: Could not convert (r, g, b) = ({r}, {g}, {b}) to HSL")
+    if l == 0 or l == 1:
+        s = 0
+    else:
+        s = (xmax - l) / min(l, 1 - l)
+    if h < 0:
+        h += 360
+    return (h / 360, s, l)
+
+
+@conversionCache
+def hslToRGB(hsl):
+    h, s, l = hsl
+    C = (1 - abs(2 * l - 1)) * s
+    hpr = h * 6
+    X = C * (1 - abs(hpr % 2 - 1))
+    m = l - C / 2
+    if 0 <= hpr < 1:
+        r, g, b = C, X, 0
+    elif 1 <= hpr < 2:
+        r, g, b = X, C, 0
+    elif 2 <= hpr < 3:
+        r, g, b = 0, C, X
+    elif 3 <= hpr < 4:
+        r, g, b = 0, X, C
+    elif 4 <= hpr < 5:
+        r, g, b = X, 0, C
+    elif 5 <= hpr < 6:
+        r, g, b = C, 0, X
+    else:
+        print(f"ERROR: Could not convert (h, s, l) = ({h}, {s}, {l}) to RGB. Hprime = {hpr}")
+    r, g, b = r + m, g + m, b + m
+    return (r, g, b)
+
+
+@conversionCache
+def hexToRGB(col):
+    r, g, b = [int(col[2 * i + 1 : 2 * i + 3], 16) / 255 for i in range(3)]
+    return (r, g, b)
+
+
+def rgbToXYZ(rgb):
+    r, g, b = rgb
+    if (r > 1 or g > 1 or b > 1):
+        r, g, b = r / 255, g / 255, b / 255
+    x=(0.430574*r+0.341550*g+0.178325*b);
+    y=(0.222015*r+0.706655*g+0.071330*b);
+    z=(0.020183*r+0.129553*g+0.939180*b);
+    return (x, y, z)
+
+def xyzToRGB(xyz):
+    x, y, z = xyz
+    r=( 3.063218*x-1.393325*y-0.475802*z);
+    g=(-0.969243*x+1.875966*y+0.041555*z);
+    b=( 0.067871*x-0.228834*y+1.069251*z);
+    return (r, g, b)
+
+
+## -- Colour Shifting
+
+def z(v, gamma):
+    return 0 if v <= 0 else 1 if v >= 1 else v ** (1 / gamma)
+
+def blindMk(rgb, t):
+    # The steps of the original Colour-based version, in the same order, on plain floats
+    wx, wy, wz = whitePoint
+    line = rBlind[t]
+    r, g, b = rgb
+    cx, cy, cz = rgbToXYZ((r ** gamma, g ** gamma, b ** gamma))
+
+    cu, cv = 0, 0
+    sum_xyz = cx + cy + cz
+    if sum_xyz != 0:
+        cu = cx / sum_xyz
+        cv = cy / sum_xyz
+    nx = wx * cy / wy
+    nz = wz * cy / wy
+    if cu < line['cpu']:
+        clm = (line['cpv'] - cv) / (line['cpu'] - cu)
+    else:
+        clm = (cv - line['cpv']) / (cu - line['cpu'])
+
+    clyi = cv - cu * clm
+    du = (line['ayi'] - clyi) / (clm - line['am'])
+    dv = (clm * du) + clyi
+
+    sx, sz = du * cy / dv, (1 - (du + dv)) * cy / dv
+    s = xyzToRGB((sx, cy, sz))
+    d = xyzToRGB((nx - sx, 0, nz - sz))
+
+    adjust = 0
+    for si, di in zip(s, d):
+        if di != 0:
+            ai = ((0 if si < 0 else 1) - si) / di
+            if 0 <= ai <= 1 and ai > adjust:
+                adjust = ai
+
+    return [z(si + (adjust * di), gamma) for si, di in zip(s, d)]
+
+
+## -- Vectorised Colour Shifting
+
+def asRGBArray(rgb):
+    """Return `rgb` as a float64 array of shape (..., 3) with values in [0, 1]."""
+    arr = np.asarray(rgb)
+    if arr.ndim == 0 or arr.shape[-1] != 3:
+        raise ValueError(f"Expected colours of shape (..., 3), got {arr.shape}")
+    if arr.dtype == np.uint8:
+        return arr.astype(np.float64) / 255
+    return arr.astype(np.float64, copy = False)
+
+def severityFraction(p):
+    # Matches colourShift: severities of 1 or more are percentages
+    if p >= 1:
+        p = p / 100
+    return p
+
+def percentSeverity(percent):
+    """A severity given in percent (0 to 100) in the form `severityFraction` reads as that percentage.
+
+    For the CLIs and the service, where "0.5" means 0.5% rather than the fraction 0.5.
+    """
+    percent = float(percent)
+    if not(0 <= percent <= 100):
+        raise ValueError(f"Severity must be a percentage from 0 to 100, got {percent:g}")
+    return percent if percent >= 1 else percent / 100
+
+def applyMatrix(m, cols):
+    # Row-wise m @ col, summed left to right to match the scalar conversions exactly
+    return np.stack([m[i, 0] * cols[:, 0] + m[i, 1] * cols[:, 1] + m[i, 2] * cols[:, 2] for i in range(3)], axis = 1)
+
+def confusionShift(lin, t):
+    # Project linear rgb along its confusion line onto the dichromat axis and back into gamut
+    cpu, cpv, am, ayi = (rBlind[t][k] for k in ('cpu', 'cpv', 'am', 'ayi'))
+    wx, wy, wz = whitePoint
+
+    c = applyMatrix(rgbToXYZMatrix, lin)
+    cy = c[:, 1]
+
+    # Chromaticity, (0, 0) for black
+    sum_xyz = c[:, 0] + c[:, 1] + c[:, 2]
+    nonzero = sum_xyz != 0
+    safeSum = np.where(nonzero, sum_xyz, 1)
+    cu = np.where(nonzero, c[:, 0] / safeSum, 0)
+    cv = np.where(nonzero, c[:, 1] / safeSum, 0)
+    nx = wx * cy / wy
+    nz = wz * cy / wy
+
+    clm = (cv - cpv) / (cu - cpu)
+    clyi = cv - cu * clm
+    du = (ayi - clyi) / (clm - am)
+    dv = (clm * du) + clyi
+
+    s = np.empty_like(c)
+    s[:, 0] = du * cy / dv
+    s[:, 1] = cy
+    s[:, 2] = (1 - (du + dv)) * cy / dv
+    d = np.empty_like(c)
+    d[:, 0] = nx - s[:, 0]
+    d[:, 1] = 0
+    d[:, 2] = nz - s[:, 2]
+    s = applyMatrix(xyzToRGBMatrix, s)
+    d = applyMatrix(xyzToRGBMatrix, d)
+
+    # Shift towards neutral until back inside the gamut
+    dNonzero = d != 0
+    target = np.where(s < 0, 0.0, 1.0)
+    adj = np.where(dNonzero, (target - s) / np.where(dNonzero, d, 1), 0)
+    adj = np.where((adj >= 0) & (adj <= 1), adj, 0)
+    adjust = adj.max(axis = 1, keepdims = True)
+    return s + adjust * d
+
+# Below this many colours the array set-up costs more than the scalar blindMk loop
+smallBatch = 12
+
+# numpy's power can round differently from Python's in the last bit. That only shows where
+# a channel is shifted onto the gamut edge, whose ~1e-17 rounding residue the 1 / gamma
+# power amplifies to ~1e-8, so rows with a channel this close to zero are redone with the
+# linear values blindMk would compute.
+edgeTolerance = 1e-10
+
+def exactPower(values, exponent):
+    """`values ** exponent` rounded as Python's float power rounds it, once per distinct value."""
+    unique, inverse = np.unique(values, return_inverse = True)
+    return np.array([v ** exponent for v in unique.tolist()], dtype = np.float64)[inverse].reshape(values.shape)
+
+def blindMkArray(rgb, t):
+    """Vectorised `blindMk` over an array of colours of shape (..., 3)."""
+    if not(t in rBlind):
+        raise ValueError(f"Unrecognised type {t}")
+    rgb = asRGBArray(rgb)
+    shape = rgb.shape
+    rgb = rgb.reshape(-1, 3)
+    if len(rgb) <= smallBatch:
+        return np.array([blindMk(col, t) for col in rgb.tolist()], dtype = np.float64).reshape(shape)
+    s = confusionShift(rgb ** gamma, t)
+    edge = np.abs(s).min(axis = 1) <= edgeTolerance
+    if edge.any():
+        s[edge] = confusionShift(exactPower(rgb[edge], gamma), t)
+    clipped = np.clip(s, 0, 1)
+    out = np.where(s <= 0, 0.0, np.where(s >= 1, 1.0, clipped ** (1 / gamma)))
+    return out.reshape(shape)
+
+def blindSimulate(rgb, t, p):
+    """Vectorised `colourShift`: blend `rgb` towards its `t` simulation by severity `p`."""
+    p = severityFraction(p)
+    rgb = asRGBArray(rgb)
+    return (1 - p) * rgb + p * blindMkArray(rgb, t)
+
+
+## -- Severity Ramps
+## Severity only changes the blend between the original colours and their full
+## simulation, so a ramp simulates once and blends on demand.
+
+def severityFractions(p):
+    # Array form of severityFraction
+    p = np.asarray(p, dtype = np.float64)
+    return np.where(p >= 1, p / 100, p)
+
+class SeverityRamp():
+    """Colours of shape (..., 3) blended from normal vision to full `t` deficiency.
+
+    `ramp[p]` equals `blindSimulate(rgb, t, p)` for any severity `p`, but `blindMkArray`
+    runs only once, when the ramp is made. `ramp.sample(severities)` stacks many
+    severities into an array of shape (n_severities, ..., 3).
+    """
+    __slots__ = ("rgb", "t", "full")
+
+    def __init__(self, rgb, t):
+        self.rgb = asRGBArray(rgb)
+        self.t = t
+        self.full = blindMkArray(self.rgb, t)
+
+    def __getitem__(self, p):
+        p = severityFraction(p)
+        return (1 - p) * self.rgb + p * self.full
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def sample(self, severities = range(101)):
+        p = severityFractions(severities).reshape((-1,) + (1,) * self.rgb.ndim)
+        return (1 - p) * self.rgb + p * self.full
+
+def severityRamps(rgb, types = tuple(rBlind)):
+    return {t : SeverityRamp(rgb, t) for t in types}
+
+
+## -- Schemes
+
+def colourShift(rgb, t, p):
+    if not(t in rBlind):
+        print(f"ERROR: Unrecognised type {t}")
+        return
+    # One colour takes the scalar path, with the same blend as blindSimulate
+    p = severityFraction(p)
+    return [(1 - p) * c + p * s for c, s in zip(rgb, blindMk(rgb, t))]
+
+def shiftScheme(scheme, t, p):
+    if not(t in rBlind):
+        print(f"ERROR: Unrecognised type {t}")
+        return
+    return schemeRamp(scheme, t)[p].tolist()
+
+def schemeRamp(scheme, t):
+    """`SeverityRamp` for a scheme given as hex strings and/or rgb triples."""
+    return SeverityRamp([hexToRGB(col) if type(col) == str else col for col in scheme], t)
+
+def themeToSVG(theme):
+    # Swatch rendering lives in svgSheet, which imports this module
+    from svgSheet import themeToSVG as renderTheme
+    return renderTheme(theme)
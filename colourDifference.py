@@ -0,0 +1,138 @@
+import numpy as np
+
+from colourCore import asRGBArray
+
+## -- CIELAB
+
+srgbToXYZMatrix = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+d65White = np.array([0.95047, 1.0, 1.08883])
+
+def srgbToLinear(rgb):
+    rgb = asRGBArray(rgb)
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((np.maximum(rgb, 0.04045) + 0.055) / 1.055) ** 2.4)
+
+def rgbToLab(rgb):
+    """Convert sRGB colours of shape (..., 3) in [0, 1] to CIELAB under D65."""
+    xyz = (srgbToLinear(rgb) @ srgbToXYZMatrix.T) / d65White
+    delta = 6 / 29
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4 / 29)
+    L = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([L, a, b], axis = -1)
+
+## -- Colour Differences
+
+def deltaE76(lab1, lab2):
+    """Euclidean (CIE76) difference between broadcastable Lab arrays of shape (..., 3)."""
+    diff = np.asarray(lab1, dtype = np.float64) - np.asarray(lab2, dtype = np.float64)
+    return np.sqrt(np.sum(diff * diff, axis = -1))
+
+def deltaE94(lab1, lab2, kL = 1, K1 = 0.045, K2 = 0.015):
+    """CIE94 difference with graphic arts weights by default; use kL = 2, K1 = 0.048, K2 = 0.014 for textiles."""
+    lab1, lab2 = np.asarray(lab1, dtype = np.float64), np.asarray(lab2, dtype = np.float64)
+    dL = lab1[..., 0] - lab2[..., 0]
+    C1 = np.hypot(lab1[..., 1], lab1[..., 2])
+    C2 = np.hypot(lab2[..., 1], lab2[..., 2])
+    dC = C1 - C2
+    da = lab1[..., 1] - lab2[..., 1]
+    db = lab1[..., 2] - lab2[..., 2]
+    dH2 = np.maximum(da * da + db * db - dC * dC, 0)
+    SC = 1 + K1 * C1
+    SH = 1 + K2 * C1
+    return np.sqrt((dL / kL) ** 2 + (dC / SC) ** 2 + dH2 / SH ** 2)
+
+def deltaE2000(lab1, lab2, kL = 1, kC = 1, kH = 1):
+    """CIEDE2000 difference between broadcastable Lab arrays of shape (..., 3)."""
+    lab1, lab2 = np.asarray(lab1, dtype = np.float64), np.asarray(lab2, dtype = np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    Cbar7 = ((C1 + C2) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(Cbar7 / (Cbar7 + 25 ** 7)))
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    chromatic = (C1p * C2p) != 0
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(chromatic, dhp, 0)
+    dHp = 2 * np.sqrt(C1p * C2p) * np.sin(np.radians(dhp) / 2)
+
+    Lbarp = (L1 + L2) / 2
+    Cbarp = (C1p + C2p) / 2
+    hSum = h1p + h2p
+    hbarp = np.where(np.abs(h1p - h2p) > 180, np.where(hSum < 360, hSum + 360, hSum - 360), hSum) / 2
+    hbarp = np.where(chromatic, hbarp, hSum)
+
+    T = (1 - 0.17 * np.cos(np.radians(hbarp - 30))
+           + 0.24 * np.cos(np.radians(2 * hbarp))
+           + 0.32 * np.cos(np.radians(3 * hbarp + 6))
+           - 0.20 * np.cos(np.radians(4 * hbarp - 63)))
+    dTheta = 30 * np.exp(-(((hbarp - 275) / 25) ** 2))
+    Cbarp7 = Cbarp ** 7
+    RC = 2 * np.sqrt(Cbarp7 / (Cbarp7 + 25 ** 7))
+    SL = 1 + (0.015 * (Lbarp - 50) ** 2) / np.sqrt(20 + (Lbarp - 50) ** 2)
+    SC = 1 + 0.045 * Cbarp
+    SH = 1 + 0.015 * Cbarp * T
+    RT = -np.sin(np.radians(2 * dTheta)) * RC
+
+    tL = dLp / (kL * SL)
+    tC = dCp / (kC * SC)
+    tH = dHp / (kH * SH)
+    return np.sqrt(tL ** 2 + tC ** 2 + tH ** 2 + RT * tC * tH)
+
+metrics = {"76" : deltaE76, "94" : deltaE94, "2000" : deltaE2000}
+
+def deltaE(lab1, lab2, metric = "2000"):
+    if not(str(metric) in metrics):
+        raise ValueError(f"Unknown colour difference metric {metric}, expected one of {list(metrics)}")
+    return metrics[str(metric)](lab1, lab2)
+
+def iterPairwiseDeltaE(lab1, lab2 = None, metric = "2000", chunkSize = 1024):
+    """Yield (start, block) where block is the all-pairs difference of rows start:start + chunkSize of `lab1` against all of `lab2`.
+
+    Memory use is proportional to chunkSize * len(lab2), however many colours there are.
+    """
+    lab1 = np.asarray(lab1, dtype = np.float64).reshape(-1, 3)
+    lab2 = lab1 if lab2 is None else np.asarray(lab2, dtype = np.float64).reshape(-1, 3)
+    for start in range(0, len(lab1), chunkSize):
+        yield start, deltaE(lab1[start : start + chunkSize, None, :], lab2[None, :, :], metric)
+
+def pairwiseDeltaE(lab1, lab2 = None, metric = "2000", chunkSize = None, out = None):
+    """All-pairs difference matrix of shape (len(lab1), len(lab2)), comparing `lab1` with itself if `lab2` is None.
+
+    With `chunkSize` the matrix is filled a block of rows at a time, bounding the temporary
+    memory; `out` may be a preallocated array or `np.memmap` to keep the result off the heap.
+    """
+    lab1 = np.asarray(lab1, dtype = np.float64).reshape(-1, 3)
+    lab2 = lab1 if lab2 is None else np.asarray(lab2, dtype = np.float64).reshape(-1, 3)
+    if out is None:
+        out = np.empty((len(lab1), len(lab2)))
+    for start, block in iterPairwiseDeltaE(lab1, lab2, metric, chunkSize or max(len(lab1), 1)):
+        out[start : start + len(block)] = block
+    return out
+
+def minPairwiseDeltaE(lab, metric = "2000"):
+    """Smallest difference between any two of the n colours in `lab` (..., n, 3).
+
+    Returns the minimum and the (i, j) indices of the closest pair, each of shape (...).
+    """
+    lab = np.asarray(lab, dtype = np.float64)
+    n = lab.shape[-2]
+    i, j = np.triu_indices(n, 1)
+    dE = deltaE(lab[..., i, :], lab[..., j, :], metric)
+    k = np.argmin(dE, axis = -1)
+    return np.take_along_axis(dE, k[..., None], axis = -1)[..., 0], i[k], j[k]
@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+import numpy as np
+
+from colourCore import rBlind, asRGBArray, severityFraction, blindMkArray
+
+## -- Lookup Tables
+
+lutDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "luts")
+fullSize = 256
+loadedLUTs = {}
+
+def lutPath(t, size, directory = None):
+    return os.path.join(directory or lutDirectory, f"blind_{t}_{size}.npy")
+
+def checkSize(size):
+    if size < 2:
+        raise ValueError(f"Lookup tables need at least 2 levels per channel, got {size}")
+
+def buildLUT(t, size = 65, chunk = 1 << 16):
+    """Tabulate the full-severity `blindMkArray` on a size³ grid of rgb values.
+
+    The full 256³ table stores 8-bit results and is indexed directly; smaller
+    tables store float32 results and are sampled with trilinear interpolation.
+    """
+    if not(t in rBlind):
+        raise ValueError(f"Unrecognised type {t}")
+    checkSize(size)
+    levels = np.linspace(0, 1, size)
+    n = size ** 3
+    table = np.empty((n, 3), dtype = np.uint8 if size == fullSize else np.float32)
+    for start in range(0, n, chunk):
+        idx = np.arange(start, min(start + chunk, n))
+        grid = np.stack([levels[idx // (size * size)], levels[(idx // size) % size], levels[idx % size]], axis = 1)
+        sim = blindMkArray(grid, t)
+        table[start : start + len(idx)] = np.rint(sim * 255) if size == fullSize else sim
+    return table.reshape(size, size, size, 3)
+
+def loadLUT(t, size = 65, directory = None, rebuild = False):
+    """Load the `t` table of the given size from disk, building and saving it if missing."""
+    checkSize(size)
+    key = (t, size, directory)
+    if key in loadedLUTs and not(rebuild):
+        return loadedLUTs[key]
+    path = lutPath(t, size, directory)
+    if rebuild or not(os.path.exists(path)):
+        table = buildLUT(t, size)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        saveLUT(path, table)
+    # The full table is 48 MB, so is paged in on demand; the interpolated ones are small
+    table = np.load(path, mmap_mode = "r" if size == fullSize else None)
+    loadedLUTs[key] = table
+    return table
+
+def saveLUT(path, table):
+    # Written beside `path` and renamed over it, so other processes loading the table
+    # (such as simService's workers) never see it half written
+    fd, temp = tempfile.mkstemp(dir = os.path.dirname(path), prefix = "." + os.path.basename(path) + ".", suffix = ".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tableFile:
+            np.save(tableFile, table)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+def gatherFull(table, rgb):
+    # One gather per pixel on 8-bit indices
+    if rgb.dtype != np.uint8:
+        rgb = np.rint(np.clip(asRGBArray(rgb), 0, 1) * 255).astype(np.uint8)
+    return table[rgb[..., 0], rgb[..., 1], rgb[..., 2]] / 255
+
+def gatherTrilinear(table, rgb):
+    size = table.shape[0]
+    flat = table.reshape(-1, 3)
+    shape = rgb.shape
+    x = np.clip(rgb.reshape(-1, 3), 0, 1).astype(np.float32) * (size - 1)
+    i0 = np.minimum(x.astype(np.intp), size - 2)
+    f = x - i0
+    fr, fg, fb = f[:, 0, None], f[:, 1, None], f[:, 2, None]
+    base = (i0[:, 0] * size + i0[:, 1]) * size + i0[:, 2]
+
+    # Interpolate along b, then g, then r between the eight surrounding grid points
+    def lerpB(offset):
+        lo = flat.take(base + offset, axis = 0)
+        return lo + (flat.take(base + offset + 1, axis = 0) - lo) * fb
+    c00, c01 = lerpB(0), lerpB(size)
+    c10, c11 = lerpB(size * size), lerpB(size * size + size)
+    c0 = c00 + (c01 - c00) * fg
+    c1 = c10 + (c11 - c10) * fg
+    return (c0 + (c1 - c0) * fr).astype(np.float64).reshape(shape)
+
+def simulateLUT(rgb, t, p = 100, size = 65, directory = None):
+    """Table-driven `blindSimulate`: look up the full-severity colour and blend by `p`.
+
+    Severity is applied at lookup time, so one table per type serves every severity.
+    """
+    table = loadLUT(t, size, directory)
+    rgb = np.asarray(rgb)
+    if size == fullSize:
+        sim = gatherFull(table, rgb)
+    else:
+        sim = gatherTrilinear(table, asRGBArray(rgb))
+    p = severityFraction(p)
+    if p == 1:
+        return sim
+    return (1 - p) * asRGBArray(rgb) + p * sim
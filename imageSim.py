@@ -0,0 +1,320 @@
+import argparse
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from colourCore import rBlind, blindSimulate, percentSeverity
+from colourLUT import simulateLUT
+
+## -- Streaming PNG
+
+pngSignature = b"\x89PNG\r\n\x1a\n"
+pngChannels = {2 : 3, 6 : 4}
+
+def unfilterRow(filterType, raw, prev, bpp):
+    # None, Sub and Up only need the row above, so a row decodes in a few array operations
+    if filterType == 0:
+        return raw
+    if filterType == 1:
+        return np.cumsum(raw.reshape(-1, bpp), axis = 0, dtype = np.uint8).reshape(-1)
+    if filterType == 2:
+        return raw + prev
+    raise ValueError(f"Unknown PNG filter type {filterType}")
+
+def paethPredictor(a, b, c):
+    pa, pb = np.abs(b - c), np.abs(a - c)
+    pc = np.abs(a + b - 2 * c)
+    return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+def predictor(filterType, a, b, c):
+    if filterType == 1:
+        return a
+    if filterType == 2:
+        return b
+    if filterType == 3:
+        return (a + b) >> 1
+    return paethPredictor(a, b, c)
+
+def unfilterRows(filters, raw, prev, bpp):
+    """Undo the filters of consecutive scanlines `raw` (n, width * bpp) below the decoded line `prev`.
+
+    Average and Paeth predict a pixel from the decoded pixels to its left, above and above
+    left, so those rows are decoded a diagonal at a time: pixel j of row r only waits for
+    diagonal r + j - 1, and each step decodes one pixel, all channels, of every row at once.
+    """
+    filters = np.asarray(filters)
+    if filters.max(initial = 0) > 4:
+        raise ValueError(f"Unknown PNG filter type {filters.max()}")
+    n, width = raw.shape[0], raw.shape[1] // bpp
+    if not(np.any(filters >= 3)):
+        out = np.empty_like(raw)
+        for i, filterType in enumerate(filters):
+            prev = out[i] = unfilterRow(filterType, raw[i], prev, bpp)
+        return out
+    # Rows are sheared into a (diagonal, row) layout: pixel j of row r is stored at [r + j + 1, r],
+    # with `prev` as row 0. Each diagonal is then one contiguous row of the layout, and its
+    # left, upper and upper left neighbours are slices of the two diagonals before it.
+    decoded = np.zeros((n + width + 1, n + 1, bpp), dtype = np.int16)
+    data = np.zeros((n + width + 1, n + 1, bpp), dtype = np.int16)
+    decoded[1 : width + 1, 0] = prev.reshape(width, bpp)
+    pixels = raw.reshape(n, width, bpp)
+    for r in range(1, n + 1):
+        data[r + 1 : r + width + 1, r] = pixels[r - 1]
+    # Only the predictors present are computed; with one filter throughout, no masks are needed
+    present = [k for k in range(1, 5) if np.any(filters == k)]
+    uniform = len(present) == 1 and np.all(filters == present[0])
+    masks = {k : (filters == k).astype(np.int16).reshape(-1, 1) for k in present}
+    for d in range(2, n + width + 1):
+        lo, hi = max(1, d - width), min(n, d - 1)
+        a = decoded[d - 1, lo : hi + 1]
+        b = decoded[d - 1, lo - 1 : hi]
+        c = decoded[d - 2, lo - 1 : hi]
+        if uniform:
+            predicted = predictor(present[0], a, b, c)
+        else:
+            predicted = sum(masks[k][lo - 1 : hi] * predictor(k, a, b, c) for k in present)
+        decoded[d, lo : hi + 1] = (data[d, lo : hi + 1] + predicted) & 0xFF
+    out = np.empty((n, width, bpp), dtype = np.uint8)
+    for r in range(1, n + 1):
+        out[r - 1] = decoded[r + 1 : r + width + 1, r]
+    return out.reshape(n, width * bpp)
+
+class PNGReader():
+    """Decode an 8-bit RGB/RGBA PNG in bands of rows, reading the file through a memmap."""
+    def __init__(self, path, readSize = 1 << 20):
+        self.path = path
+        self.readSize = readSize
+        self.data = np.memmap(path, dtype = np.uint8, mode = "r")
+        if bytes(self.data[:8]) != pngSignature:
+            raise ValueError(f"{path} is not a PNG file")
+        self.chunks = []
+        pos = 8
+        while pos + 8 <= len(self.data):
+            length, = struct.unpack(">I", bytes(self.data[pos : pos + 4]))
+            kind = bytes(self.data[pos + 4 : pos + 8])
+            self.chunks.append((kind, pos + 8, length))
+            pos += 12 + length
+            if kind == b"IEND":
+                break
+        if not(self.chunks) or self.chunks[0][0] != b"IHDR":
+            raise ValueError(f"{path} does not start with an IHDR chunk")
+        kind, start, length = self.chunks[0]
+        self.width, self.height, bitDepth, colourType, _, _, interlace = struct.unpack(">IIBBBBB", bytes(self.data[start : start + 13]))
+        if bitDepth != 8 or colourType not in pngChannels or interlace != 0:
+            raise ValueError(f"{path}: only non-interlaced 8-bit RGB/RGBA PNGs are supported")
+        self.channels = pngChannels[colourType]
+
+    def compressed(self):
+        for kind, start, length in self.chunks:
+            if kind != b"IDAT":
+                continue
+            for i in range(start, start + length, self.readSize):
+                yield bytes(self.data[i : min(i + self.readSize, start + length)])
+
+    def scanlines(self, batchBytes = 128 << 20):
+        # Lines are unfiltered in batches, so each diagonal step of Average and Paeth rows
+        # covers many rows. The sheared int16 copies take about four times a batch's bytes,
+        # which `batchBytes` bounds.
+        stride = 1 + self.width * self.channels
+        batchRows = max(16, min(1024, batchBytes // (4 * stride)))
+        decompressor = zlib.decompressobj()
+        buffer = bytearray()
+        prev = np.zeros(stride - 1, dtype = np.uint8)
+        decoded = 0
+        try:
+            for data in self.compressed():
+                while data:
+                    buffer += decompressor.decompress(data, self.readSize)
+                    data = decompressor.unconsumed_tail
+                    while len(buffer) >= batchRows * stride:
+                        for line in self.unfilterBatch(buffer, stride, batchRows, prev):
+                            prev = line
+                            yield line
+                        decoded += batchRows
+            buffer += decompressor.flush()
+        except zlib.error as error:
+            raise ValueError(f"{self.path}: corrupt image data ({error})")
+        # A truncated file still decodes up to where it was cut, so check it all arrived
+        if not(decompressor.eof):
+            raise ValueError(f"{self.path}: image data is truncated")
+        n = len(buffer) // stride
+        if decoded + n != self.height or len(buffer) % stride:
+            raise ValueError(f"{self.path}: image data holds {decoded + n} rows but the header gives {self.height}")
+        if n:
+            for line in self.unfilterBatch(buffer, stride, n, prev):
+                yield line
+
+    def unfilterBatch(self, buffer, stride, rows, prev):
+        lines = np.frombuffer(bytes(buffer[: rows * stride]), dtype = np.uint8).reshape(rows, stride)
+        del buffer[: rows * stride]
+        return unfilterRows(lines[:, 0], lines[:, 1:], prev, self.channels)
+
+    def bands(self, rows):
+        band = []
+        for line in self.scanlines():
+            band.append(line)
+            if len(band) == rows:
+                yield np.stack(band).reshape(rows, self.width, self.channels)
+                band = []
+        if band:
+            yield np.stack(band).reshape(len(band), self.width, self.channels)
+
+    def close(self):
+        del self.data
+
+class PNGWriter():
+    """Encode an 8-bit RGB/RGBA PNG band by band, flushing IDAT chunks as they fill."""
+    def __init__(self, path, width, height, channels, chunkSize = 1 << 20, level = 6):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.chunkSize = chunkSize
+        self.compressor = zlib.compressobj(level)
+        self.pending = bytearray()
+        self.file = open(path, "wb")
+        self.file.write(pngSignature)
+        colourType = {v : k for k, v in pngChannels.items()}[channels]
+        self.writeChunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colourType, 0, 0, 0))
+
+    def writeChunk(self, kind, payload):
+        self.file.write(struct.pack(">I", len(payload)))
+        self.file.write(kind)
+        self.file.write(payload)
+        self.file.write(struct.pack(">I", zlib.crc32(payload, zlib.crc32(kind))))
+
+    def write(self, band):
+        # Sub filter: each byte minus the one a pixel to its left
+        rows = np.ascontiguousarray(band, dtype = np.uint8).reshape(band.shape[0], -1)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype = np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1 : self.channels + 1] = rows[:, : self.channels]
+        filtered[:, self.channels + 1 :] = rows[:, self.channels :] - rows[:, : -self.channels]
+        self.pending += self.compressor.compress(filtered.tobytes())
+        while len(self.pending) >= self.chunkSize:
+            self.writeChunk(b"IDAT", bytes(self.pending[: self.chunkSize]))
+            del self.pending[: self.chunkSize]
+
+    def close(self):
+        self.pending += self.compressor.flush()
+        if self.pending:
+            self.writeChunk(b"IDAT", bytes(self.pending))
+        self.writeChunk(b"IEND", b"")
+        self.file.close()
+
+## -- Raw RGB
+
+class RawReader():
+    """Read bands of rows from a headerless 8-bit RGB file through a memmap."""
+    def __init__(self, path, width, height, channels = 3):
+        self.width, self.height, self.channels = width, height, channels
+        self.data = np.memmap(path, dtype = np.uint8, mode = "r", shape = (height, width, channels))
+
+    def bands(self, rows):
+        for i in range(0, self.height, rows):
+            yield self.data[i : i + rows]
+
+    def close(self):
+        del self.data
+
+class RawWriter():
+    """Write bands of rows into a headerless 8-bit RGB file through a memmap."""
+    def __init__(self, path, width, height, channels = 3):
+        self.data = np.memmap(path, dtype = np.uint8, mode = "w+", shape = (height, width, channels))
+        self.row = 0
+
+    def write(self, band):
+        self.data[self.row : self.row + band.shape[0]] = band
+        self.row += band.shape[0]
+
+    def close(self):
+        self.data.flush()
+        del self.data
+
+## -- Simulation
+
+rawExtensions = (".rgb", ".raw")
+
+def openImage(path, size = None):
+    if path.lower().endswith(rawExtensions):
+        if size is None:
+            raise ValueError(f"Raw image {path} needs an explicit (width, height)")
+        return RawReader(path, *size)
+    return PNGReader(path)
+
+def createImage(path, width, height, channels):
+    if path.lower().endswith(rawExtensions):
+        return RawWriter(path, width, height, channels)
+    return PNGWriter(path, width, height, channels)
+
+def simulateTile(tile, t, p, lutSize = None):
+    out = np.array(tile, dtype = np.uint8)
+    if lutSize:
+        shifted = simulateLUT(tile[..., :3], t, p, lutSize)
+    else:
+        shifted = blindSimulate(tile[..., :3], t, p)
+    out[..., :3] = np.rint(np.clip(shifted, 0, 1) * 255)
+    return out
+
+def simulateImage(src, dst, t, p = 100, tileRows = 64, tileCols = 4096, size = None, lutSize = None):
+    """Simulate colour blindness type `t` over an image, streaming it through in tiles.
+
+    PNG and raw RGB (`.rgb`/`.raw`, which need `size = (width, height)`) are supported
+    for both input and output. Peak memory is bounded by the tile size, not the image.
+    With `lutSize` set, colours come from the precomputed tables in `colourLUT`.
+    """
+    if not(t in rBlind):
+        raise ValueError(f"Unrecognised type {t}")
+    reader = openImage(src, size)
+    channels = 3 if dst.lower().endswith(rawExtensions) else reader.channels
+    writer = createImage(dst, reader.width, reader.height, channels)
+    done = False
+    try:
+        for band in reader.bands(tileRows):
+            out = np.empty((band.shape[0], reader.width, channels), dtype = np.uint8)
+            for j in range(0, reader.width, tileCols):
+                tile = simulateTile(band[:, j : j + tileCols], t, p, lutSize)
+                if channels == 4 and tile.shape[-1] == 3:
+                    out[:, j : j + tileCols, :3] = tile
+                    out[:, j : j + tileCols, 3] = 255
+                else:
+                    out[:, j : j + tileCols] = tile[..., :channels]
+            writer.write(out)
+        done = True
+    finally:
+        writer.close()
+        reader.close()
+        # Leave no partial image behind when the source could not be read in full
+        if not(done):
+            os.remove(dst)
+
+def simulateImages(paths, outDir, types = ("prot", "deut", "trit"), p = 100, **kwargs):
+    """Simulate each image for every type in `types`, writing `<name>_<type><ext>` into `outDir`."""
+    os.makedirs(outDir, exist_ok = True)
+    outputs = []
+    for path in paths:
+        name, ext = os.path.splitext(os.path.basename(path))
+        for t in types:
+            dst = os.path.join(outDir, f"{name}_{t}{ext}")
+            simulateImage(path, dst, t, p, **kwargs)
+            outputs.append(dst)
+    return outputs
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Simulate colour blindness over PNG or raw RGB images.")
+    parser.add_argument("images", nargs = "+", help = "PNG or raw RGB (.rgb/.raw) images")
+    parser.add_argument("-o", "--out-dir", default = "simulated", help = "Directory for the simulated images")
+    parser.add_argument("-t", "--types", nargs = "+", default = list(rBlind), choices = list(rBlind))
+    parser.add_argument("-s", "--severity", type = percentSeverity, default = 100, help = "Severity in percent, 0 to 100")
+    parser.add_argument("--size", help = "WIDTHxHEIGHT of raw RGB inputs")
+    parser.add_argument("--tile-rows", type = int, default = 64)
+    parser.add_argument("--tile-cols", type = int, default = 4096)
+    parser.add_argument("--lut", type = int, help = "Use a precomputed lookup table of this size (33, 65 or 256)")
+    args = parser.parse_args(argv)
+    size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+    for out in simulateImages(args.images, args.out_dir, args.types, args.severity, tileRows = args.tile_rows, tileCols = args.tile_cols, size = size, lutSize = args.lut):
+        print(out)
+
+if __name__ == "__main__":
+    main()
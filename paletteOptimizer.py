@@ -0,0 +1,186 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import qoplots
+from colourCore import rgbToHex, percentSeverity
+from colourDifference import rgbToLab, minPairwiseDeltaE
+from simulationModels import simulate
+from catalogue import visions, selectSchemes, streamChunks
+
+## -- Palette Optimiser
+## Nudges a scheme's accents in HSL, with the same lighten / darken moves as qoplots plus
+## hue rotation and saturation changes, to raise the smallest colour difference between
+## any two accents across normal vision and each simulated deficiency.
+##
+## Only the two accents of the closest pair are moved: changing any other accent leaves
+## that pair's difference, and so the score, where it is. Each round scores every move of
+## that pair in one batch, and candidates stop being simulated as soon as one vision
+## drops them to the current best.
+
+## -- Vectorised HSL
+## Hue in degrees as in qoplots, saturation and lightness in [0, 1].
+
+def rgbToHSLArray(rgb):
+    rgb = np.asarray(rgb, dtype = np.float64)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = rgb.max(axis = -1)
+    xmin = rgb.min(axis = -1)
+    C = v - xmin
+    l = (v + xmin) / 2
+    denom = 1 - np.abs(2 * l - 1)
+    s = np.where(denom > 0, 2 * (v - l) / np.where(denom > 0, denom, 1), 0)
+    safeC = np.where(C > 0, C, 1)
+    h = np.select([C == 0, v == r, v == g], [0, ((g - b) / safeC) % 6, 2 + (b - r) / safeC], 4 + (r - g) / safeC)
+    return np.stack([h * 60, s, l], axis = -1)
+
+def hslToRGBArray(hsl):
+    hsl = np.asarray(hsl, dtype = np.float64)
+    h, s, l = hsl[..., 0] % 360, hsl[..., 1], hsl[..., 2]
+    # Standard f(n) form of the piecewise hexcone
+    a = s * np.minimum(l, 1 - l)
+    n = np.array([0, 8, 4])
+    k = (n + h[..., None] / 30) % 12
+    return l[..., None] - a[..., None] * np.clip(np.minimum(k - 3, 9 - k), -1, 1)
+
+def hueDrift(h, h0):
+    return np.abs((h - h0 + 180) % 360 - 180)
+
+## -- Scoring
+
+def paletteScores(accents, severity = 100, model = "meyer", metric = "2000", floor = None):
+    """Smallest pairwise difference across all visions for palettes `accents` (n, k, 3).
+
+    Palettes whose score falls to `floor` or below in any vision are not simulated
+    further; their returned score is then only an upper bound, itself at most `floor`.
+    """
+    accents = np.asarray(accents, dtype = np.float64)
+    score = np.full(len(accents), np.inf)
+    alive = np.arange(len(accents))
+    for v in visions:
+        rgb = accents[alive] if v == "normal" else simulate(accents[alive], model, v, severity)
+        score[alive] = np.minimum(score[alive], minPairwiseDeltaE(rgbToLab(rgb), metric)[0])
+        if floor is not None:
+            alive = alive[score[alive] > floor]
+            if not(len(alive)):
+                break
+    return score
+
+def worstPair(accents, severity = 100, model = "meyer", metric = "2000"):
+    # Indices of the two accents that are closest in whichever vision is worst
+    accents = np.asarray(accents, dtype = np.float64)
+    simulated = np.stack([accents if v == "normal" else simulate(accents, model, v, severity) for v in visions])
+    dE, first, second = minPairwiseDeltaE(rgbToLab(simulated), metric)
+    v = int(np.argmin(dE))
+    return int(first[v]), int(second[v]), float(dE[v])
+
+## -- Search
+
+def colourMoves(hsl, hsl0, hueStep, lightStep, satStep, maxHueDrift):
+    """Candidate HSL values for one colour: itself, rotated hue, lightened, darkened, more and less saturated."""
+    h, s, l = hsl
+    moves = np.array([
+        [h, s, l],
+        [h + hueStep, s, l],
+        [h - hueStep, s, l],
+        [h, s, 1 - (1 - l) * (1 - lightStep)],
+        [h, s, l * (1 - lightStep)],
+        [h, s + satStep, l],
+        [h, s - satStep, l],
+    ])
+    # Keep the hue within maxHueDrift of the original and the rest in range
+    drift = (moves[:, 0] - hsl0[0] + 180) % 360 - 180
+    moves[:, 0] = hsl0[0] + np.clip(drift, -maxHueDrift, maxHueDrift)
+    moves[:, 1] = np.clip(moves[:, 1], 0, 1)
+    moves[:, 2] = np.clip(moves[:, 2], 0.02, 0.98)
+    return moves
+
+def optimizePalette(accents, maxHueDrift = 15, severity = 100, model = "meyer", metric = "2000",
+                    hueStep = 8, lightStep = 0.2, satStep = 0.2, minStep = 1 / 16, maxRounds = 200):
+    """Adjust `accents` (k, 3) to maximise their smallest pairwise difference across all visions.
+
+    Each round tries every combination of moves for the closest pair's two accents. A round
+    without improvement halves the step sizes; the search ends once they have shrunk by
+    `minStep` or after `maxRounds` rounds. Returns the new accents, their score and the
+    starting score.
+    """
+    rgb = np.array(accents, dtype = np.float64)
+    hsl0 = rgbToHSLArray(rgb)
+    hsl = hsl0.copy()
+    best = float(paletteScores(rgb[None], severity, model, metric)[0])
+    start = best
+    scale = 1
+    for _ in range(maxRounds):
+        if scale < minStep:
+            break
+        i, j, _ = worstPair(rgb, severity, model, metric)
+        movesI = colourMoves(hsl[i], hsl0[i], hueStep * scale, lightStep * scale, satStep * scale, maxHueDrift)
+        movesJ = colourMoves(hsl[j], hsl0[j], hueStep * scale, lightStep * scale, satStep * scale, maxHueDrift)
+        # Every pairing of a move for i with a move for j, dropping the unchanged palette
+        candidates = np.repeat(hsl[None], len(movesI) * len(movesJ), axis = 0)
+        candidates[:, i] = np.repeat(movesI, len(movesJ), axis = 0)
+        candidates[:, j] = np.tile(movesJ, (len(movesI), 1))
+        candidates = candidates[1:]
+        scores = paletteScores(hslToRGBArray(candidates), severity, model, metric, floor = best)
+        k = int(np.argmax(scores))
+        if scores[k] > best + 1e-9:
+            best = float(scores[k])
+            hsl = candidates[k]
+            rgb = hslToRGBArray(hsl)
+        else:
+            scale /= 2
+    return rgb, best, start
+
+def optimizeSchemes(names, accents, **options):
+    results = []
+    for name, palette in zip(names, accents):
+        begin = time.perf_counter()
+        rgb, after, before = optimizePalette(palette, **options)
+        drift = hueDrift(rgbToHSLArray(rgb)[:, 0], rgbToHSLArray(palette)[:, 0])
+        results.append({
+            "name"      : name,
+            "before"    : before,
+            "after"     : after,
+            "original"  : [rgbToHex(tuple(col)) for col in np.asarray(palette, dtype = np.float64).tolist()],
+            "optimized" : [rgbToHex(tuple(col)) for col in rgb.tolist()],
+            "hue_drift" : drift.round(2).tolist(),
+            "seconds"   : time.perf_counter() - begin,
+        })
+    return results
+
+def optimizeCatalogue(schemes = None, workers = None, chunkSize = 8, store = None, **options):
+    """Optimise schemes from `store` (default: colourSchemes.json) across a process pool, yielding results as chunks finish."""
+    store = qoplots.getSchemeStore(store)
+    names = selectSchemes(store, schemes)
+    accents = store.colours[[store.index(name) for name in names], 2:8].astype(np.float64)
+    return streamChunks(optimizeSchemes, (names, accents), chunkSize, workers, **options)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Adjust scheme accents so they stay distinguishable under every type of colour blindness.")
+    parser.add_argument("schemes", nargs = "*", help = "Schemes to optimise (default: all)")
+    parser.add_argument("-o", "--out", help = "Write results to this JSON file")
+    parser.add_argument("-d", "--max-hue-drift", type = float, default = 15, help = "Largest hue change per accent in degrees")
+    parser.add_argument("-s", "--severity", type = percentSeverity, default = 100, help = "Severity in percent, 0 to 100")
+    parser.add_argument("-m", "--metric", default = "2000", choices = ["76", "94", "2000"], help = "CIE colour difference formula")
+    parser.add_argument("--model", default = "meyer", choices = ["meyer", "vienot", "brettel", "machado"])
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "Worker processes (default: one per CPU)")
+    parser.add_argument("--store", help = "Scheme JSON or ingested palette store (.npy) to read (default: colourSchemes.json)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    options = dict(maxHueDrift = args.max_hue_drift, severity = args.severity, model = args.model, metric = args.metric)
+    results = []
+    for result in optimizeCatalogue(args.schemes or None, args.workers, store = args.store, **options):
+        results.append(result)
+        print(f"{result['name']:<32}{result['before']:8.2f} -> {result['after']:6.2f}  "
+              f"{' '.join(result['optimized'])}  ({result['seconds']:.2f}s)", file = sys.stderr)
+    if args.out:
+        with open(args.out, "w") as outFile:
+            json.dump(sorted(results, key = lambda r : r["name"]), outFile, indent = 2)
+    print(f"Optimised {len(results)} schemes in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from qoplots import colourNames, defaultColours
+
+## -- Palette Store
+## Palettes live on disk in two files: "<base>.npy" holds every palette's colours as a
+## float32 array of shape (n, 10, 3), in `colourNames` order, and "<base>.names.json" holds the
+## names (row i belongs to names[i]) and the stamp of the source they were ingested from.
+## The array is memory-mapped, so reading a slice of a large library only touches those
+## rows. Sources are read incrementally and rows are appended to the .npy as they arrive.
+
+def storePaths(base):
+    base = base[:-4] if base.endswith(".npy") else base
+    return base + ".npy", base + ".names.json"
+
+class PaletteStore():
+    """Read-only view of an ingested palette store, loading names and colours on first use."""
+    def __init__(self, base):
+        self.arrayPath, self.indexPath = storePaths(base)
+        with open(self.indexPath) as indexFile:
+            index = json.load(indexFile)
+        self.keys = index["names"]
+        self.source = index.get("source")
+        self.stamp = tuple(index["stamp"]) if index.get("stamp") else None
+        self._colours = None
+        self._rows = None
+        self._lookup = None
+        self._sortedNames = None
+
+    # Kept for SchemeStore compatibility: row i belongs to names[i]
+    @property
+    def names(self):
+        return self.keys
+
+    @property
+    def sortedNames(self):
+        """The names in sorted order, as SchemeStore listed them, built on first use."""
+        if self._sortedNames is None:
+            self._sortedNames = sorted(self.keys)
+        return self._sortedNames
+
+    @property
+    def colours(self):
+        if self._colours is None:
+            self._colours = np.load(self.arrayPath, mmap_mode = "r")
+        return self._colours
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = {name.lower() : i for i, name in enumerate(self.keys)}
+        return self._rows
+
+    @property
+    def lookup(self):
+        if self._lookup is None:
+            self._lookup = {name.lower() : name for name in self.keys}
+        return self._lookup
+
+    def __contains__(self, name):
+        return name.lower() in self.rows
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index(self, name):
+        return self.rows[name.lower()]
+
+    def get(self, name):
+        """The palette `name` as a dict of hex strings keyed by colour name."""
+        row = np.rint(np.asarray(self.colours[self.index(name)], dtype = np.float64) * 255).astype(int)
+        colours = {col : "#{:02X}{:02X}{:02X}".format(*rgb) for col, rgb in zip(colourNames, row.tolist())}
+        colours["name"] = self.keys[self.index(name)]
+        return colours
+
+## -- Writing
+
+class NpyAppender():
+    """Write rows to a .npy file as they arrive, filling in the final shape when closed.
+
+    A fixed size header is reserved up front and rewritten with the row count at the end.
+    """
+    headerSize = 128
+
+    def __init__(self, path, rowShape, dtype = np.float32, file = None):
+        self.path = path
+        self.rowShape = tuple(rowShape)
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self.file = open(path, "wb") if file is None else file
+        self.writeHeader()
+
+    def writeHeader(self):
+        header = repr({"descr" : np.lib.format.dtype_to_descr(self.dtype), "fortran_order" : False,
+                       "shape" : (self.count,) + self.rowShape})
+        # magic, version 1.0, little-endian header length, then the padded header
+        size = self.headerSize - 10
+        self.file.seek(0)
+        self.file.write(b"\x93NUMPY\x01\x00" + size.to_bytes(2, "little") + header.ljust(size - 1).encode("latin1") + b"\n")
+
+    def append(self, rows):
+        rows = np.ascontiguousarray(rows, dtype = self.dtype).reshape((-1,) + self.rowShape)
+        self.file.write(rows.tobytes())
+        self.count += len(rows)
+
+    def close(self):
+        self.writeHeader()
+        self.file.close()
+
+def hexArray(hexes):
+    """rgb values (n, 3) in [0, 1] for '#RRGGBB' strings, parsed in one call."""
+    digits = "".join(h[1:] if h.startswith("#") else h for h in hexes)
+    if len(digits) != 6 * len(hexes):
+        raise ValueError("Expected colours as 6 digit hex strings")
+    return np.frombuffer(bytes.fromhex(digits), dtype = np.uint8).reshape(-1, 3) / 255
+
+## -- Streaming Sources
+
+class JSONStream():
+    """Incremental reader for one large JSON object or array, decoding a member at a time."""
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file, chunkSize = 1 << 16):
+        self.file = file
+        self.chunkSize = chunkSize
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        chunk = self.file.read(self.chunkSize)
+        if not(chunk):
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not(self.more()):
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, chars):
+        char = self.peek()
+        if not(char) or not(char in chars):
+            raise ValueError(f"Expected one of {chars!r} in JSON source, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not(self.more()):
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not(self.eof) and self.more():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield (key, value) members of a top-level object, or (None, item) for a top-level array."""
+        close = "}" if self.expect("{[") == "{" else "]"
+        if self.peek() == close:
+            return
+        while True:
+            key = None
+            if close == "}":
+                key = self.value()
+                self.expect(":")
+            yield key, self.value()
+            if self.expect("," + close) == close:
+                return
+
+def paletteRecord(key, record):
+    """(name, 10 hex strings) from a scheme dict, a {"name", "colours"} dict or a bare list."""
+    if isinstance(record, dict) and "colours" in record:
+        name, hexes = record.get("name", key), list(record["colours"])
+    elif isinstance(record, dict):
+        name, hexes = record.get("name", key), [record.get(col, defaultColours.get(col)) for col in colourNames]
+    else:
+        name, hexes = key, list(record)
+    if len(hexes) == len(colourNames) - len(defaultColours):
+        hexes += [defaultColours[col] for col in colourNames[-len(defaultColours):]]
+    if name is None or len(hexes) != len(colourNames) or None in hexes:
+        raise ValueError(f"Palette {name!r} does not have all {len(colourNames)} colours")
+    return str(name), hexes
+
+def iterJSON(path, chunkSize = 1 << 16):
+    with open(path) as sourceFile:
+        for key, record in JSONStream(sourceFile, chunkSize).items():
+            yield key, record
+
+def iterJSONL(path):
+    with open(path) as sourceFile:
+        for number, line in enumerate(sourceFile, 1):
+            if line.strip():
+                try:
+                    yield None, json.loads(line)
+                except ValueError as error:
+                    # Passed on rather than raised, so ingest can skip the line like any malformed palette
+                    yield None, ValueError(f"{path}, line {number}: {error}")
+
+def iterCSV(path):
+    # Either columns named after colourNames, or the name followed by the colours in order
+    with open(path, newline = "") as sourceFile:
+        reader = csv.DictReader(sourceFile)
+        if not(reader.fieldnames) or not("name" in reader.fieldnames):
+            raise ValueError(f"{path} needs a header row with a \"name\" column")
+        named = all(col in reader.fieldnames for col in colourNames[:-len(defaultColours)])
+        for row in reader:
+            if named:
+                yield None, {"name" : row["name"], **{col : row[col] for col in colourNames if row.get(col)}}
+            else:
+                yield None, {"name" : row["name"], "colours" : [row[col] for col in reader.fieldnames if col != "name" and row[col]]}
+
+sourceReaders = {".json" : iterJSON, ".jsonl" : iterJSONL, ".ndjson" : iterJSONL, ".csv" : iterCSV}
+
+def iterRecords(path):
+    extension = os.path.splitext(path)[1].lower()
+    if not(extension in sourceReaders):
+        raise ValueError(f"Unknown palette source {path}, expected one of {list(sourceReaders)}")
+    return sourceReaders[extension](path)
+
+def temporaryFile(path):
+    """(fd, path) of a new, uniquely named file beside `path` to be renamed over it."""
+    fd, temp = tempfile.mkstemp(dir = os.path.dirname(path) or ".", prefix = "." + os.path.basename(path) + ".", suffix = ".tmp")
+    # mkstemp creates the file private to its owner; the store should stay readable like any other file
+    os.chmod(temp, 0o644)
+    return fd, temp
+
+def ingest(sources, base, chunkSize = 4096, stamp = None, skipInvalid = True):
+    """Stream palettes from JSON, JSONL or CSV `sources` into the store at `base`.
+
+    Rows are written `chunkSize` palettes at a time, so memory use does not grow with the
+    size of the sources. Later duplicates of a name (ignoring case) and, with
+    `skipInvalid`, malformed palettes and JSONL lines are skipped. A CSV without a name
+    column raises ValueError either way. The store is replaced atomically.
+    Returns the number of palettes written and skipped.
+    """
+    sources = [sources] if isinstance(sources, str) else list(sources)
+    arrayPath, indexPath = storePaths(base)
+    # Temporaries unique to this call, so concurrent ingests into one base never share a file
+    arrayTemp = temporaryFile(arrayPath)
+    indexTemp = None
+    try:
+        writer = NpyAppender(arrayTemp[1], (len(colourNames), 3), file = os.fdopen(arrayTemp[0], "wb"))
+        names, seen, rows, skipped = [], set(), [], 0
+        try:
+            for source in sources:
+                for key, record in iterRecords(source):
+                    try:
+                        if isinstance(record, ValueError):
+                            raise record
+                        name, colours = paletteRecord(key, record)
+                        rgb = hexArray(colours)
+                    except (ValueError, TypeError, AttributeError):
+                        if not(skipInvalid):
+                            raise
+                        skipped += 1
+                        continue
+                    if name.lower() in seen:
+                        skipped += 1
+                        continue
+                    seen.add(name.lower())
+                    names.append(name)
+                    rows.append(rgb)
+                    if len(rows) >= chunkSize:
+                        writer.append(np.stack(rows))
+                        rows = []
+            if rows:
+                writer.append(np.stack(rows))
+        finally:
+            writer.close()
+        indexTemp = temporaryFile(indexPath)
+        with os.fdopen(indexTemp[0], "w") as indexFile:
+            json.dump({"source" : sources[0] if len(sources) == 1 else sources, "stamp" : stamp, "names" : names}, indexFile)
+        os.replace(arrayTemp[1], arrayPath)
+        os.replace(indexTemp[1], indexPath)
+    except BaseException:
+        for temp in (arrayTemp, indexTemp):
+            if temp is not None and os.path.exists(temp[1]):
+                os.remove(temp[1])
+        raise
+    return len(names), skipped
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Ingest palette libraries (JSON, JSONL or CSV) into a memory-mapped palette store.")
+    parser.add_argument("sources", nargs = "+", help = "Palette files to read, in order")
+    parser.add_argument("-o", "--out", required = True, help = "Store base path; writes <out>.npy and <out>.names.json")
+    parser.add_argument("--chunk", type = int, default = 4096, help = "Palettes converted per write")
+    parser.add_argument("--strict", action = "store_true", help = "Stop at the first malformed palette")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    written, skipped = ingest(args.sources, args.out, args.chunk, skipInvalid = not(args.strict))
+    print(f"Wrote {written} palettes ({skipped} skipped) to {storePaths(args.out)[0]} in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+
+import qoplots
+from colourCore import rgbToHex, schemeRamp, SeverityRamp
+from svgSheet import themeToSVG
+from timings import stage
+
+## -- Thread-safe Preview Rendering
+## Figures are built with the object-oriented API and every style setting is passed to the
+## figure and axes directly, so nothing reads a style from, or writes one to, the global
+## rcParams. Previews for different schemes can therefore render concurrently.
+
+def plotStyle(scheme):
+    """rcParams-style dict for a scheme given as hex strings or shifted rgb colours."""
+    hexScheme = qoplots.Scheme(*[col if type(col) == str else rgbToHex(col) for col in scheme])
+    return hexScheme.style(overrides = {'text.usetex' : False})
+
+def styledFigure(style, dpi):
+    fig = Figure(figsize = style['figure.figsize'], dpi = dpi, facecolor = style['figure.facecolor'])
+    ax = fig.add_subplot()
+    ax.set_facecolor(style['axes.facecolor'])
+    ax.set_prop_cycle(style['axes.prop_cycle'])
+    for side, spine in ax.spines.items():
+        spine.set_edgecolor(style['axes.edgecolor'])
+        spine.set_linewidth(style['axes.linewidth'])
+        spine.set_visible(style.get(f'axes.spines.{side}', True))
+    ax.tick_params(axis = 'x', colors = style['xtick.color'], width = style['xtick.major.width'])
+    ax.tick_params(axis = 'y', colors = style['ytick.color'], width = style['ytick.major.width'])
+    ax.xaxis.label.set_color(style['axes.labelcolor'])
+    ax.yaxis.label.set_color(style['axes.labelcolor'])
+    return fig, ax
+
+def styledLegend(ax, style):
+    legend = ax.legend(
+        facecolor = style['legend.facecolor'],
+        edgecolor = style['legend.edgecolor'],
+        labelcolor = style['text.color'],
+        prop = {'family' : style['font.family']})
+    return legend
+
+def linesFigure(scheme, x, y, dpi = 300):
+    """Figure plotting each row of `y` against `x` in the colours of `scheme`, and its style."""
+    style = plotStyle(scheme)
+    fig, ax = styledFigure(style, dpi)
+    for j in range(len(y)):
+        ax.plot(x, y[j], label = f"Accent{j % 6 + 1}" + (" (light)" if j >= 6 else ""))
+    styledLegend(ax, style)
+    ax.tick_params(
+        axis       ='both',
+        which      ='both',
+        bottom     =False,
+        top        =False,
+        left       = False,
+        right      = False,
+        labelleft  = False,
+        labelbottom=False)
+    return fig, style
+
+@lru_cache(maxsize = 64)
+def cachedRamp(schemeName, t):
+    # Simulated once per scheme and type, so moving the severity slider only re-blends
+    return schemeRamp(list(qoplots.loadScheme(schemeName)), t)
+
+## -- Simulated Renders
+## Rather than re-plotting in shifted colours, the figure is rendered once and its pixels
+## are simulated. This also shifts anti-aliased edges, images and colormaps in the plot.
+## A plot has few distinct colours, so only those are simulated, all types at once, and
+## the results are gathered back into full images.
+
+def figurePixels(fig, pad = 0.1):
+    """Draw `fig` on an Agg canvas and return its RGBA pixels cropped as bbox_inches = "tight" would."""
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    # A view of the canvas memory, not a copy
+    rgba = np.asarray(canvas.buffer_rgba())
+    bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad)
+    top = max(math.floor(rgba.shape[0] - bbox.y1 * fig.dpi), 0)
+    left = max(math.floor(bbox.x0 * fig.dpi), 0)
+    return rgba[top : top + int(bbox.height * fig.dpi), left : left + int(bbox.width * fig.dpi)].copy()
+
+class PixelColours():
+    """The distinct colours of an RGBA image, for simulating an image a colour at a time."""
+    def __init__(self, rgba):
+        self.rgba = rgba
+        rgb = rgba[..., :3].reshape(-1, 3).astype(np.uint32)
+        codes, self.inverse = np.unique((rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2], return_inverse = True)
+        self.colours = np.stack([codes >> 16, (codes >> 8) & 0xFF, codes & 0xFF], axis = 1) / 255
+        self.ramps = {}
+
+    def ramp(self, t):
+        if not(t in self.ramps):
+            self.ramps[t] = SeverityRamp(self.colours, t)
+        return self.ramps[t]
+
+    def simulate(self, types, p):
+        """(len(types), height, width, 4) images simulating each type at severity `p`."""
+        shifted = np.stack([self.ramp(t)[p] for t in types])
+        shifted = np.rint(shifted * 255).astype(np.uint8)
+        out = np.empty((len(types),) + self.rgba.shape, dtype = np.uint8)
+        out[..., :3] = shifted[:, self.inverse].reshape((len(types),) + self.rgba.shape[:2] + (3,))
+        out[..., 3] = self.rgba[..., 3]
+        return out
+
+def encodePNG(rgba, dpi = 300):
+    buffer = io.BytesIO()
+    imsave(buffer, rgba, format = "png", dpi = dpi)
+    return buffer.getvalue()
+
+encodePool = ThreadPoolExecutor(max_workers = 4)
+
+def renderPixels(schemeName, x, y, dpi = 300):
+    """Render a scheme's example plot once, as a `PixelColours` to simulate from."""
+    with stage("plot"):
+        fig, _ = linesFigure(list(qoplots.loadScheme(schemeName)), x, y, dpi)
+    with stage("rasterize"):
+        rgba = figurePixels(fig)
+    with stage("unique colours"):
+        return PixelColours(rgba)
+
+def renderPreviews(schemeName, types, p, x, y, dpi = 300, pixels = None):
+    """Swatch SVGs and PNGs for normal vision and each of `types` at severity `p`, keyed by type (None for normal).
+
+    The plot is rendered once and simulated per pixel; pass `pixels` from `renderPixels`
+    to reuse a render across severities.
+    """
+    pixels = pixels or renderPixels(schemeName, x, y, dpi)
+    with stage("simulate"):
+        images = [pixels.rgba] + list(pixels.simulate(types, p))
+    with stage("encode"):
+        pngs = list(encodePool.map(lambda rgba : encodePNG(rgba, dpi), images))
+    with stage("swatches"):
+        svgs = [themeToSVG(list(qoplots.loadScheme(schemeName)))] + [themeToSVG(cachedRamp(schemeName, t)[p].tolist()) for t in types]
+    return dict(zip([None] + list(types), zip(svgs, pngs)))
@@ -1,45 +1,115 @@
-import json
-from matplotlib import rcParams
-from cycler import cycler
 import os
+import threading
 from typing import NamedTuple
 
-def hslToRGB(col):
-    import numpy as np
+from colourCache import conversionCache, conversionCacheInfo, clearConversionCaches
+
+## -- Scheme Store
+
+schemeFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "colourSchemes.json")
+colourNames = ["ForegroundColour", "BackgroundColour", "Accent1", "Accent2", "Accent3", "Accent4", "Accent5", "Accent6", "Hyperlink", "FollowedHyperlink"]
+defaultColours = {"Hyperlink" : "#0000FF", "FollowedHyperlink" : "#FF00FF"}
+
+def hexToRGBTuple(colString):
+    colString = colString.replace("#", "")
+    return tuple(int(colString[i : i + 2], 16) / 255 for i in (0, 2, 4))
+
+def fileStamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+schemeStores = {}
+schemeStoreLock = threading.Lock()
+# Where schemes are read from when no store is given; see useSchemeStore
+schemeSource = schemeFile
+
+def useSchemeStore(path = schemeFile):
+    """Read schemes from `path`, a scheme JSON file or an ingested store's .npy, wherever no store is given."""
+    global schemeSource
+    getSchemeStore(path)
+    schemeSource = path
+
+def getSchemeStore(path = None):
+    """Return the `paletteStore.PaletteStore` for `path`, a scheme JSON file or an ingested store's .npy.
+
+    `path` defaults to the store set with `useSchemeStore`, colourSchemes.json unless changed.
+    A JSON file is streamed into a memory-mapped store beside it the first time it is
+    read, and again whenever its modification time or size changes. After that, schemes
+    are read from the store by row without parsing the JSON.
+    """
+    from paletteStore import PaletteStore, ingest, storePaths
+    path = schemeSource if path is None else path
+    if path.endswith(".npy"):
+        stamp = fileStamp(path)
+        store = schemeStores.get(path)
+        if store is None or store.fileStamp != stamp:
+            store = PaletteStore(path)
+            store.fileStamp = stamp
+            schemeStores[path] = store
+        return store
+
+    stamp = fileStamp(path)
+    store = schemeStores.get(path)
+    if store is not None and store.stamp == stamp:
+        return store
+    # One thread ingests a changed file while the others wait for its store
+    with schemeStoreLock:
+        stamp = fileStamp(path)
+        store = schemeStores.get(path)
+        if store is not None and store.stamp == stamp:
+            return store
+        base = os.path.splitext(path)[0]
+        try:
+            store = PaletteStore(base)
+        except (OSError, ValueError, KeyError):
+            store = None
+        if store is None or store.stamp != stamp:
+            try:
+                ingest(path, base, stamp = stamp)
+            except OSError:
+                # Read-only checkout: keep the store in the temporary directory instead
+                import tempfile
+                base = os.path.join(tempfile.gettempdir(), f"{os.path.basename(base)}-{stamp[0]}-{stamp[1]}")
+                if not(os.path.exists(storePaths(base)[1])):
+                    ingest(path, base, stamp = stamp)
+            store = PaletteStore(base)
+        schemeStores[path] = store
+    return store
+
+## -- Conversions
+
+@conversionCache
+def hslToRGBTuple(col):
     h, s, l = col
     C = (1 - abs(2 * l - 1)) * s
     Hpr = h / 60
     X = C * (1 - abs(Hpr % 2 - 1))
     m = l - C / 2
     if Hpr < 1:
-        return np.array([C + m, X + m, 0 + m])
+        return (C + m, X + m, 0 + m)
     elif Hpr < 2:
-        return np.array([X + m, C + m, 0 + m])
+        return (X + m, C + m, 0 + m)
     elif Hpr < 3:
-        return np.array([0 + m, C + m, X + m])
+        return (0 + m, C + m, X + m)
     elif Hpr < 4:
-        return np.array([0 + m, X + m, C + m])
+        return (0 + m, X + m, C + m)
     elif Hpr < 5:
-        return np.array([X + m, 0 + m, C + m])
+        return (X + m, 0 + m, C + m)
     elif Hpr < 6:
-        return np.array([C + m, 0 + m, X + m])
+        return (C + m, 0 + m, X + m)
     else:
-        return np.array([m    , m    , m    ])
+        return (m    , m    , m    )
 
-def rgbToHSL(colString):
-    import numpy as np
+@conversionCache
+def rgbToHSLTuple(colString):
     if type(colString) == type(""):
-        colString = colString.replace("#", "")
-        colArray = np.array([int(colString[0:2], 16), int(colString[2:4], 16), int(colString[4:6], 16)], dtype = "float") / 255
+        colArray = hexToRGBTuple(colString)
     else:
-        try:
-            colArray = np.array(colString, dtype = "float")
-            if np.max(colArray) > 1:
-                colArray = colArray / 255
-        except:
-            raise TypeError(f"Could not convert colour to array. Type {type(colString)}")
-    v = np.max(colArray)
-    xmin = np.min(colArray)
+        colArray = colString
+        if max(colArray) > 1:
+            colArray = tuple(c / 255 for c in colArray)
+    v = max(colArray)
+    xmin = min(colArray)
     C = v - xmin
     l = (v + xmin) / 2
     if l == 0 or l == 1:
@@ -55,72 +125,83 @@ def rgbToHSL(colString):
     elif v == colArray[2]:
         h = 60 * (4 + (colArray[0] - colArray[1]) / C)
 
-    return np.array([h, s, l])
+    return (h, s, l)
 
-def lighten(colString, p):
+def hslToRGB(col):
     import numpy as np
+    return np.array(hslToRGBTuple(col))
+
+def rgbToHSL(colString):
+    import numpy as np
+    return np.array(rgbToHSLTuple(colString))
+
+def rgbTupleToHex(rgb):
+    return "#{:02X}{:02X}{:02X}".format(int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
+
+@conversionCache
+def lighten(colString, p):
     if p > 1:
         p = p / 100
-    hsl = rgbToHSL(colString)
-    hsl[2] = 1 - (1 - hsl[2]) * (1 - p)
-    rgb = hslToRGB(hsl)
-    return "#{:02X}{:02X}{:02X}".format(int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
+    h, s, l = rgbToHSLTuple(colString)
+    return rgbTupleToHex(hslToRGBTuple((h, s, 1 - (1 - l) * (1 - p))))
 
+@conversionCache
 def darken(colString, p):
-    import numpy as np
     if p > 1:
         p = p / 100
-    hsl = rgbToHSL(colString)
-    hsl[2] = hsl[2] * (1 - p)
-    rgb = hslToRGB(hsl)
-    return "#{:02X}{:02X}{:02X}".format(int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
+    h, s, l = rgbToHSLTuple(colString)
+    return rgbTupleToHex(hslToRGBTuple((h, s, l * (1 - p))))
 
-def init(docType = "report", dark = None, scheme = "twilight"):
-    class Scheme(NamedTuple):
-        ForegroundColour : str
-        BackgroundColour : str
-        Accent1 : str
-        Accent2 : str
-        Accent3 : str
-        Accent4 : str
-        Accent5 : str
-        Accent6 : str
-        Hyperlink : str
-        FollowedHyperlink : str
+class Scheme(NamedTuple):
+    ForegroundColour : str
+    BackgroundColour : str
+    Accent1 : str
+    Accent2 : str
+    Accent3 : str
+    Accent4 : str
+    Accent5 : str
+    Accent6 : str
+    Hyperlink : str
+    FollowedHyperlink : str
 
-    # Verify type of docType and scheme
-    if not isinstance(docType, str):
-        raise TypeError("\n\n\tArgument \"docType\" must be of type \"str\"\n\n")
+    def style(self, docType = "report", dark = False, overrides = None):
+        style = schemeStyle(self, docType, dark)
+        style.update(overrides or {})
+        return style
+
+    def context(self, docType = "report", dark = False, overrides = None):
+        from matplotlib import rc_context
+        return rc_context(self.style(docType, dark, overrides))
+
+def loadScheme(scheme = "twilight", dark = False, store = None):
     if not isinstance(scheme, str):
         raise TypeError("\n\n\tArgument \"scheme\" must be of type \"str\"\n\n")
-    # Allow capital and lowercase versions
-    scheme = scheme.lower()
-    docType = docType.lower()
-    if docType not in ["report", "presentation"]:
-        raise ValueError("\n\n\tUnknown document type \"{}\"\n\n".format(docType))
-    # Automatically use dark mode for presentations and light mode for reports unless otherwise specified.
-    if dark == None:
-        dark = not(docType == "report")
-    # Find and read the colour schemes
-    pypath=os.path.dirname(__file__)
-    with open(pypath + "/colourSchemes.json", "r") as colourFile:
-        colourSchemes = json.load(colourFile)
-
+    colourSchemes = getSchemeStore(store)
     if not(scheme in colourSchemes):
         raise Exception("\n\n\tColour scheme \"{}\" is not recognised.\n\n".format(scheme))
-
-    colScheme = colourSchemes[scheme]
-
+    # Copied as dark mode swaps colours in place
+    colScheme = dict(colourSchemes.get(scheme))
     if dark:
         tempCol = colScheme["ForegroundColour"]
         colScheme["ForegroundColour"] = colScheme["BackgroundColour"]
         colScheme["BackgroundColour"] = tempCol
+    return Scheme(**{name : colScheme.get(name, defaultColours.get(name)) for name in colourNames})
+
+def schemeStyle(scheme, docType = "report", dark = False):
+    """The rcParams for plotting with `scheme` (a Scheme or 10 hex colours) in a report or presentation."""
+    from cycler import cycler
+    if not isinstance(docType, str):
+        raise TypeError("\n\n\tArgument \"docType\" must be of type \"str\"\n\n")
+    docType = docType.lower()
+    if docType not in ["report", "presentation"]:
+        raise ValueError("\n\n\tUnknown document type \"{}\"\n\n".format(docType))
+    colScheme = dict(zip(colourNames, scheme))
 
     linewidths = {'presentation' : 1.4, 'report' : 0.8}
     markerSizes = {'presentation' : 4, 'report' : 6}
 
-    formatting = {
-        'presentation' : {
+    if docType == "presentation":
+        return {
             'text.color' : colScheme["ForegroundColour"],
             'axes.labelcolor' : colScheme["ForegroundColour"],
             'axes.edgecolor' : colScheme["Accent1"],
@@ -151,64 +232,69 @@ def init(docType = "report", dark = None, scheme = "twilight"):
             'savefig.facecolor' : colScheme["BackgroundColour"],
             'savefig.edgecolor' : 'none',
             'font.family' : 'serif'
-        },
-        'report' : {
-            'text.color' : colScheme["ForegroundColour"],
-            'axes.labelcolor' : colScheme["ForegroundColour"],
-            'axes.edgecolor' : colScheme["ForegroundColour"],
-            'xtick.color' : colScheme["ForegroundColour"],
-            'ytick.color' : colScheme["ForegroundColour"],
-            'axes.facecolor' : colScheme["BackgroundColour"],
-            'figure.facecolor' : "white",
-            'axes.facecolor' : colScheme["BackgroundColour"],
-            'legend.edgecolor' : colScheme["ForegroundColour"],
-            'legend.facecolor' : colScheme["BackgroundColour"],
-            'axes.spines.top' : True,
-            'axes.spines.right' : True,
-            'axes.prop_cycle' : cycler(
-                'color',
-                [colScheme["Accent" + str(i)] for i in range(1, 7)] +
-                [lighten(
-                    colScheme["Accent" + str(i)],
-                    0.3
-                ) for i in range(1, 7)]
-            ) if not(dark) else cycler(
-                'color',
-                [colScheme["Accent" + str(i)] for i in range(1, 7)] +
-                [darken(
-                    colScheme["Accent" + str(i)],
-                    0.3
-                ) for i in range(1, 7)]
-            ),
-            'axes.linewidth' : linewidths['report'],
-            'xtick.major.width' : linewidths['report'],
-            'ytick.major.width' : linewidths['report'],
-            'lines.markersize' : markerSizes['report'],
-            'figure.figsize' : (5, 3.5),
-            'text.latex.preamble' : "\\usepackage{amsmath, amssymb}",
-            'text.usetex' : True,
-            'savefig.facecolor' : "white",
-            'savefig.edgecolor' : 'none',
-            'font.family' : 'serif'
         }
+    return {
+        'text.color' : colScheme["ForegroundColour"],
+        'axes.labelcolor' : colScheme["ForegroundColour"],
+        'axes.edgecolor' : colScheme["ForegroundColour"],
+        'xtick.color' : colScheme["ForegroundColour"],
+        'ytick.color' : colScheme["ForegroundColour"],
+        'axes.facecolor' : colScheme["BackgroundColour"],
+        'figure.facecolor' : "white",
+        'axes.facecolor' : colScheme["BackgroundColour"],
+        'legend.edgecolor' : colScheme["ForegroundColour"],
+        'legend.facecolor' : colScheme["BackgroundColour"],
+        'axes.spines.top' : True,
+        'axes.spines.right' : True,
+        'axes.prop_cycle' : cycler(
+            'color',
+            [colScheme["Accent" + str(i)] for i in range(1, 7)] +
+            [lighten(
+                colScheme["Accent" + str(i)],
+                0.3
+            ) for i in range(1, 7)]
+        ) if not(dark) else cycler(
+            'color',
+            [colScheme["Accent" + str(i)] for i in range(1, 7)] +
+            [darken(
+                colScheme["Accent" + str(i)],
+                0.3
+            ) for i in range(1, 7)]
+        ),
+        'axes.linewidth' : linewidths['report'],
+        'xtick.major.width' : linewidths['report'],
+        'ytick.major.width' : linewidths['report'],
+        'lines.markersize' : markerSizes['report'],
+        'figure.figsize' : (5, 3.5),
+        'text.latex.preamble' : "\\usepackage{amsmath, amssymb}",
+        'text.usetex' : True,
+        'savefig.facecolor' : "white",
+        'savefig.edgecolor' : 'none',
+        'font.family' : 'serif'
     }
 
+def init(docType = "report", dark = None, scheme = "twilight", store = None):
+    # Verify type of docType and scheme
+    if not isinstance(docType, str):
+        raise TypeError("\n\n\tArgument \"docType\" must be of type \"str\"\n\n")
+    if not isinstance(scheme, str):
+        raise TypeError("\n\n\tArgument \"scheme\" must be of type \"str\"\n\n")
+    # Allow capital and lowercase versions
+    scheme = scheme.lower()
+    docType = docType.lower()
+    if docType not in ["report", "presentation"]:
+        raise ValueError("\n\n\tUnknown document type \"{}\"\n\n".format(docType))
+    # Automatically use dark mode for presentations and light mode for reports unless otherwise specified.
+    if dark == None:
+        dark = not(docType == "report")
+
     global schemeColours
-    schemeColours = Scheme(
-        ForegroundColour = colScheme["ForegroundColour"],
-        BackgroundColour = colScheme["BackgroundColour"],
-        Accent1 = colScheme["Accent1"],
-        Accent2 = colScheme["Accent2"],
-        Accent3 = colScheme["Accent3"],
-        Accent4 = colScheme["Accent4"],
-        Accent5 = colScheme["Accent5"],
-        Accent6 = colScheme["Accent6"],
-        Hyperlink = colScheme["Hyperlink"] if "Hyperlink" in colScheme else "#0000FF",
-        FollowedHyperlink = colScheme["FollowedHyperlink"] if "FollowedHyperlink" in colScheme else "#FF00FF"
-    )
-
-    for key, val in formatting[docType].items():
+    schemeColours = loadScheme(scheme, dark, store)
+
+    from matplotlib import rcParams
+    for key, val in schemeStyle(schemeColours, docType, dark).items():
         rcParams[key] = val
+    return schemeColours
 
 def getScheme():
     if 'schemeColours' in globals():
@@ -216,8 +302,5 @@ def getScheme():
     else:
         raise ValueError("No scheme available. You must call qoplots.init() first.")
 
-def getAvailableSchemes():
-    pypath=os.path.dirname(__file__)
-    with open(pypath + "/colourSchemes.json", "r") as colourFile:
-        colourSchemes = json.load(colourFile)
-    return list(colourSchemes.keys())
+def getAvailableSchemes(store = None):
+    return list(getSchemeStore(store).keys)
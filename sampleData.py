@@ -0,0 +1,94 @@
+import numpy as np
+
+## -- Vectorised OpenSimplex Noise
+## A NumPy port of the 2D OpenSimplex noise in the `opensimplex` package, evaluating
+## every point at once. For a given seed it gives the same values as
+## `OpenSimplex(seed).noise2(x, y)`.
+
+stretch2 = -0.211324865405187
+squish2 = 0.366025403784439
+norm2 = 47
+gradients2 = np.array([5, 2, 2, 5, -5, 2, -2, 5, 5, -2, 2, -5, -5, -2, -2, -5], dtype = np.int64)
+
+def wrap64(x):
+    return (x + 2 ** 63) % 2 ** 64 - 2 ** 63
+
+def permutation(seed = 0):
+    perm = np.zeros(256, dtype = np.int64)
+    source = list(range(256))
+    for _ in range(3):
+        seed = wrap64(seed * 6364136223846793005 + 1442695040888963407)
+    for i in range(255, -1, -1):
+        seed = wrap64(seed * 6364136223846793005 + 1442695040888963407)
+        r = int((seed + 31) % (i + 1))
+        perm[i] = source[r]
+        source[r] = source[i]
+    return perm
+
+def contribution(perm, xsb, ysb, dx, dy):
+    attn = 2 - dx * dx - dy * dy
+    index = perm[(perm[xsb & 0xFF] + ysb) & 0xFF] & 0x0E
+    extrapolated = gradients2[index] * dx + gradients2[index + 1] * dy
+    return np.where(attn > 0, attn ** 4 * extrapolated, 0)
+
+def noise2(x, y, seed = 0, perm = None):
+    """2D OpenSimplex noise at each point of the broadcast arrays `x` and `y`."""
+    if perm is None:
+        perm = permutation(seed)
+    x, y = np.broadcast_arrays(np.asarray(x, dtype = np.float64), np.asarray(y, dtype = np.float64))
+
+    # Place input coordinates onto the grid and find the rhombus super-cell origin
+    stretchOffset = (x + y) * stretch2
+    xs = x + stretchOffset
+    ys = y + stretchOffset
+    xsb = np.floor(xs).astype(np.int64)
+    ysb = np.floor(ys).astype(np.int64)
+    squishOffset = (xsb + ysb) * squish2
+    xins = xs - xsb
+    yins = ys - ysb
+    inSum = xins + yins
+    dx0 = x - (xsb + squishOffset)
+    dy0 = y - (ysb + squishOffset)
+
+    value = contribution(perm, xsb + 1, ysb, dx0 - 1 - squish2, dy0 - squish2)
+    value = value + contribution(perm, xsb, ysb + 1, dx0 - squish2, dy0 - 1 - squish2)
+
+    # Pick the extra vertex for whichever triangle of the rhombus the point lies in
+    lower = inSum <= 1
+    xGreater = xins > yins
+    zins = np.where(lower, 1 - inSum, 2 - inSum)
+    nearOrigin = np.where(lower, (zins > xins) | (zins > yins), (zins < xins) | (zins < yins))
+
+    lowerOrigin = lower & nearOrigin
+    lowerFar = lower & ~nearOrigin
+    upperOrigin = ~lower & nearOrigin
+    xsvExt = np.select(
+        [lowerOrigin & xGreater, lowerOrigin, lowerFar, upperOrigin & xGreater, upperOrigin],
+        [xsb + 1, xsb - 1, xsb + 1, xsb + 2, xsb], xsb)
+    ysvExt = np.select(
+        [lowerOrigin & xGreater, lowerOrigin, lowerFar, upperOrigin & xGreater, upperOrigin],
+        [ysb - 1, ysb + 1, ysb + 1, ysb, ysb + 2], ysb)
+    dxExt = np.select(
+        [lowerOrigin & xGreater, lowerOrigin, lowerFar, upperOrigin & xGreater, upperOrigin],
+        [dx0 - 1, dx0 + 1, dx0 - 1 - 2 * squish2, dx0 - 2 - 2 * squish2, dx0 + 0 - 2 * squish2], dx0)
+    dyExt = np.select(
+        [lowerOrigin & xGreater, lowerOrigin, lowerFar, upperOrigin & xGreater, upperOrigin],
+        [dy0 + 1, dy0 - 1, dy0 - 1 - 2 * squish2, dy0 + 0 - 2 * squish2, dy0 - 2 - 2 * squish2], dy0)
+
+    # Contribution from (0, 0), or (1, 1) in the upper triangle
+    xsb = np.where(lower, xsb, xsb + 1)
+    ysb = np.where(lower, ysb, ysb + 1)
+    dx0 = np.where(lower, dx0, dx0 - 1 - 2 * squish2)
+    dy0 = np.where(lower, dy0, dy0 - 1 - 2 * squish2)
+    value = value + contribution(perm, xsb, ysb, dx0, dy0)
+    value = value + contribution(perm, xsvExt, ysvExt, dxExt, dyExt)
+    return value / norm2
+
+def noiseLines(nLines = 6, nPoints = 200, xMax = 5, seed = 0):
+    """Example data: `nLines` rows of noise sampled at `nPoints` points on [0, `xMax`].
+
+    Row `j` follows the line y = j through the noise field, as the app always has.
+    Returns x of shape (nPoints,) and y of shape (nLines, nPoints).
+    """
+    x = np.linspace(0, xMax, nPoints)
+    return x, noise2(x[None, :], np.arange(nLines, dtype = np.float64)[:, None], seed)
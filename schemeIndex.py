@@ -0,0 +1,140 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import qoplots
+from colourCore import rBlind, blindSimulate, hexToRGB
+from colourDifference import rgbToLab, deltaE, minPairwiseDeltaE
+from catalogue import visions
+
+## -- Scheme Feature Index
+## Per-scheme features are precomputed once and saved next to the scheme file: the Lab
+## accents under normal vision and each simulated deficiency, and how far apart the
+## closest two accents are in each. Queries are then a single broadcast over all schemes.
+## The index of another scheme file or ingested store is saved beside it as <name>.index.npz.
+
+indexFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemeIndex.npz")
+
+class SchemeIndex():
+    def __init__(self, names, lab, minDE, severity, stamp):
+        self.names = list(names)
+        self.lab = lab          # (n_schemes, n_visions, 6, 3)
+        self.minDE = minDE      # (n_schemes, n_visions)
+        self.severity = severity
+        self.stamp = stamp
+        self.rows = {name.lower() : i for i, name in enumerate(self.names)}
+
+    def save(self, path = indexFile):
+        np.savez(path, names = np.array(self.names), lab = self.lab, minDE = self.minDE,
+                 severity = self.severity, stamp = np.array(self.stamp))
+
+    @classmethod
+    def load(cls, path = indexFile):
+        with np.load(path) as data:
+            return cls(data["names"].tolist(), data["lab"], data["minDE"], float(data["severity"]), tuple(data["stamp"].tolist()))
+
+def simulateVisions(rgb, severity = 100):
+    """Stack `rgb` (..., 3) as seen with normal vision and each deficiency, giving (n_visions, ..., 3)."""
+    rgb = np.asarray(rgb, dtype = np.float64)
+    return np.stack([rgb] + [blindSimulate(rgb, t, severity) for t in rBlind])
+
+def sourcePath(store = None):
+    return qoplots.schemeSource if store is None else store
+
+def indexPath(store = None):
+    """Where the index of `store` (default: the current scheme store) is saved."""
+    source = sourcePath(store)
+    if os.path.abspath(source) == os.path.abspath(qoplots.schemeFile):
+        return indexFile
+    return os.path.splitext(source)[0] + ".index.npz"
+
+def buildIndex(severity = 100, store = None):
+    source = sourcePath(store)
+    store = qoplots.getSchemeStore(source)
+    accents = store.colours[:, 2:8].astype(np.float64)
+    lab = np.moveaxis(rgbToLab(simulateVisions(accents, severity)), 0, 1)
+    minDE = minPairwiseDeltaE(lab)[0]
+    return SchemeIndex(store.names, lab.astype(np.float32), minDE.astype(np.float32), severity, qoplots.fileStamp(source))
+
+def loadIndex(path = None, severity = 100, rebuild = False, store = None):
+    """Load the saved index of `store`, rebuilding it if the store or severity has changed since."""
+    path = indexPath(store) if path is None else path
+    stamp = qoplots.fileStamp(sourcePath(store))
+    if not(rebuild) and os.path.exists(path):
+        index = SchemeIndex.load(path)
+        if index.stamp == stamp and index.severity == severity:
+            return index
+    index = buildIndex(severity, store)
+    index.save(path)
+    return index
+
+## -- Queries
+
+def parsePalette(palette):
+    return np.array([hexToRGB(col) if type(col) == str else tuple(col) for col in palette], dtype = np.float64)
+
+def paletteDistance(index, targetLab, vision = "normal", metric = "2000"):
+    # Mean over the target colours of the difference to the closest accent in each scheme
+    v = visions.index(vision)
+    dE = deltaE(targetLab[None, :, None, :], index.lab[:, v, None, :, :], metric)
+    return dE.min(axis = 2).mean(axis = 1)
+
+def nearestSchemes(palette, k = 10, index = None, vision = "normal", survive = (), minDE = 10, metric = "2000", exclude = ()):
+    """The `k` schemes whose accents best match `palette` (hex strings or rgb triples).
+
+    With `vision` set to a deficiency, both the palette and the schemes are compared as
+    simulated for it. `survive` lists visions in which a scheme's closest two accents
+    must still be at least `minDE` apart. Returns (name, distance, min ΔE per vision).
+    """
+    index = index or loadIndex()
+    rgb = parsePalette(palette)
+    if vision != "normal":
+        rgb = blindSimulate(rgb, vision, index.severity)
+    dist = paletteDistance(index, rgbToLab(rgb), vision, metric)
+    keep = np.ones(len(dist), dtype = bool)
+    for v in survive:
+        keep &= index.minDE[:, visions.index(v)] >= minDE
+    for name in exclude:
+        keep[index.rows[name.lower()]] = False
+    candidates = np.flatnonzero(keep)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(dist[candidates], k)[:k]]
+    candidates = candidates[np.argsort(dist[candidates])]
+    return [(index.names[i], float(dist[i]), dict(zip(visions, index.minDE[i].tolist()))) for i in candidates]
+
+def similarSchemes(name, k = 10, index = None, store = None, **kwargs):
+    """The `k` schemes closest to the accents of scheme `name` in `store`, excluding itself."""
+    index = index or loadIndex(store = store)
+    palette = qoplots.loadScheme(name, store = store)[2:8]
+    return nearestSchemes(palette, k, index, exclude = (name,), **kwargs)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Find colour schemes matching a palette, optionally only those that stay distinct under colour blindness.")
+    parser.add_argument("palette", nargs = "?", help = "Comma separated hex colours, e.g. \"#E69F00,#56B4E9\"")
+    parser.add_argument("--like", help = "Use the accents of this scheme as the palette")
+    parser.add_argument("-k", type = int, default = 10)
+    parser.add_argument("--vision", default = "normal", choices = visions, help = "Compare colours as seen with this vision")
+    parser.add_argument("--survive", nargs = "+", default = [], choices = visions, help = "Only schemes whose accents stay distinct in these visions")
+    parser.add_argument("--min-de", type = float, default = 10, help = "Smallest CIEDE2000 between accents that counts as distinct")
+    parser.add_argument("--rebuild", action = "store_true", help = "Rebuild the saved index")
+    parser.add_argument("--store", help = "Scheme JSON or ingested palette store (.npy) to read (default: colourSchemes.json)")
+    args = parser.parse_args(argv)
+    if not(args.palette or args.like):
+        parser.error("give a palette or --like SCHEME")
+
+    index = loadIndex(rebuild = args.rebuild, store = args.store)
+    start = time.perf_counter()
+    options = dict(vision = args.vision, survive = args.survive, minDE = args.min_de)
+    if args.like:
+        results = similarSchemes(args.like, args.k, index, args.store, **options)
+    else:
+        results = nearestSchemes(args.palette.split(","), args.k, index, **options)
+    elapsed = time.perf_counter() - start
+    for name, dist, minDE in results:
+        print(f"{name:<32}{dist:8.2f}   " + "  ".join(f"{v} {d:5.1f}" for v, d in minDE.items()))
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import qoplots
+from colourCore import rBlind, percentSeverity
+from simulationModels import models
+
+## -- Simulation Service
+## A small HTTP/1.1 server on a TCP port or Unix socket, for tools that want simulations
+## without importing the Streamlit app. It runs on asyncio streams from the standard
+## library; everything CPU heavy runs in a process pool.
+##
+##   GET  /schemes                 names of every scheme
+##   GET  /schemes/<name>          one scheme's colours
+##   POST /shift                   {"scheme": name} or {"colours": [hex, ...]}, with "type",
+##                                 "severity" (percent, 0 to 100) and "model"; returns {"colours": [hex, ...]}
+##   POST /simulate?type=prot      a PNG body, with optional "severity" and "lut" (33, 65 or 256);
+##                                 returns the simulated PNG, streamed in chunks
+##
+## Shift requests arriving close together are sent to the pool as one batch. Once
+## `maxPending` requests are in progress, new work is turned away with 503 and a
+## Retry-After header rather than queued without bound. A request is admitted before its
+## body is read, so the limit bounds the memory held in bodies too; JSON bodies are
+## limited to `maxJSONBody` bytes and only PNG uploads may use `maxBody`.
+
+# Lookup table sizes a request may ask for; each is built and saved once per type
+lutSizes = ("33", "65", "256")
+
+reasons = {200 : "OK", 400 : "Bad Request", 404 : "Not Found", 405 : "Method Not Allowed", 411 : "Length Required",
+           413 : "Payload Too Large", 500 : "Internal Server Error", 503 : "Service Unavailable"}
+
+class RequestError(Exception):
+    def __init__(self, status, message, headers = ()):
+        super().__init__(message)
+        self.status = status
+        self.headers = list(headers)
+
+## -- Workers
+## These run in the pool processes.
+
+def shiftBatch(jobs):
+    """Shift many requests' colours, one simulation per (model, type, severity). Returns (ok, result) per job."""
+    import numpy as np
+    from colourCore import hexToRGB, rgbToHex
+    from simulationModels import simulate
+    results = [None] * len(jobs)
+    groups = {}
+    for k, job in enumerate(jobs):
+        groups.setdefault((job["model"], job["type"], job["severity"]), []).append(k)
+    for (model, t, p), members in groups.items():
+        # Colours are parsed per job, so one malformed request fails alone
+        parsed, rows = [], []
+        for k in members:
+            try:
+                rows.append(np.array([hexToRGB(col) for col in jobs[k]["colours"]], dtype = np.float64).reshape(-1, 3))
+                parsed.append(k)
+            except (ValueError, TypeError) as error:
+                results[k] = (False, f"Bad colour in {jobs[k]['colours']!r}: {error}")
+        if not(parsed):
+            continue
+        try:
+            shifted = np.clip(simulate(np.concatenate(rows), model, t, p), 0, 1).tolist()
+        except (ValueError, TypeError) as error:
+            # The whole group shares its model, type and severity, so these errors apply to every job in it
+            for k in parsed:
+                results[k] = (False, str(error))
+            continue
+        start = 0
+        for k, rgb in zip(parsed, rows):
+            results[k] = (True, [rgbToHex(tuple(col)) for col in shifted[start : start + len(rgb)]])
+            start += len(rgb)
+    return results
+
+def simulatePNG(src, dst, t, p, lutSize):
+    from imageSim import simulateImage
+    simulateImage(src, dst, t, p, lutSize = lutSize)
+    return os.path.getsize(dst)
+
+def warmWorker():
+    # Pay the imports once per worker rather than on its first request
+    import imageSim, simulationModels
+
+## -- Batching
+
+class Batcher():
+    """Collects jobs for up to `delay` seconds, or `maxSize` jobs, and runs them as one pool call."""
+    def __init__(self, pool, fn, maxSize = 64, delay = 0.002):
+        self.pool = pool
+        self.fn = fn
+        self.maxSize = maxSize
+        self.delay = delay
+        self.pending = []
+        self.timer = None
+
+    async def submit(self, job):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((job, future))
+        if len(self.pending) >= self.maxSize:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if not(batch):
+            return
+        task = asyncio.get_running_loop().run_in_executor(self.pool, self.fn, [job for job, _ in batch])
+        task.add_done_callback(lambda done : self.distribute(batch, done))
+
+    def distribute(self, batch, done):
+        error = done.exception()
+        for k, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[k])
+
+## -- HTTP
+
+class SimService():
+    def __init__(self, workers = None, maxPending = 256, maxBody = 64 << 20, maxJSONBody = 1 << 20, batchSize = 64, batchDelay = 0.002,
+                 chunkSize = 1 << 16, store = None):
+        self.pool = ProcessPoolExecutor(max_workers = workers, initializer = warmWorker)
+        # Start the workers before any connection is open. Forked on the first job instead,
+        # they would inherit the client sockets open at the time and keep them from closing.
+        self.pool.submit(os.getpid).result()
+        self.batcher = Batcher(self.pool, shiftBatch, batchSize, batchDelay)
+        self.maxPending = maxPending
+        self.maxBody = maxBody
+        self.maxJSONBody = maxJSONBody
+        self.chunkSize = chunkSize
+        self.pending = 0
+        self.store = store
+        # Opened up front, so a bad store path fails at start-up rather than on the first request
+        qoplots.getSchemeStore(store)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures = True)
+
+    ## -- Connection handling
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.readHead(reader)
+                except RequestError as error:
+                    await self.sendJSON(writer, error.status, {"error" : str(error)}, close = True)
+                    break
+                if request is None:
+                    break
+                method, target, headers, length = request
+                keepAlive = headers.get("connection", "").lower() != "close"
+                # Every POST runs on the pool
+                work = method == "POST"
+                body = None
+                try:
+                    if work:
+                        self.admit()
+                    try:
+                        body = await self.readBody(reader, target, length)
+                        await self.route(writer, method, target, body, keepAlive)
+                    finally:
+                        if work:
+                            self.pending -= 1
+                except RequestError as error:
+                    # A body left unread cannot be skipped over to the next request
+                    keepAlive = keepAlive and body is not None
+                    await self.sendJSON(writer, error.status, {"error" : str(error)}, close = not(keepAlive), extra = error.headers)
+                except ValueError as error:
+                    await self.sendJSON(writer, 400, {"error" : str(error)}, close = not(keepAlive))
+                except Exception as error:
+                    await self.sendJSON(writer, 500, {"error" : f"{type(error).__name__}: {error}"}, close = True)
+                    break
+                if not(keepAlive):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def readHead(self, reader):
+        line = await reader.readline()
+        if not(line):
+            return None
+        try:
+            method, target, _ = line.decode("latin1").split(" ", 2)
+        except ValueError:
+            raise RequestError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise RequestError(411, "Send a Content-Length rather than a chunked body")
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise RequestError(400, "Malformed Content-Length")
+        if length < 0:
+            raise RequestError(400, "Malformed Content-Length")
+        return method.upper(), target, headers, length
+
+    async def readBody(self, reader, target, length):
+        limit = self.maxBody if urlsplit(target).path.rstrip("/") == "/simulate" else self.maxJSONBody
+        if length > limit:
+            raise RequestError(413, f"Bodies are limited to {limit} bytes")
+        return await reader.readexactly(length) if length else b""
+
+    async def sendResponse(self, writer, status, body, contentType, close = False, extra = ()):
+        head = [f"HTTP/1.1 {status} {reasons.get(status, '')}", f"Content-Type: {contentType}", f"Content-Length: {len(body)}"]
+        head += list(extra) + (["Connection: close"] if close else [])
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin1") + body)
+        await writer.drain()
+
+    async def sendJSON(self, writer, status, payload, close = False, extra = ()):
+        await self.sendResponse(writer, status, json.dumps(payload).encode(), "application/json", close, extra)
+
+    async def sendFileChunked(self, writer, path, contentType, close = False):
+        # drain() after every chunk, so a slow client slows the read instead of filling memory
+        head = [f"HTTP/1.1 200 OK", f"Content-Type: {contentType}", "Transfer-Encoding: chunked"] + (["Connection: close"] if close else [])
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin1"))
+        with open(path, "rb") as source:
+            while True:
+                chunk = source.read(self.chunkSize)
+                if not(chunk):
+                    break
+                writer.write(f"{len(chunk):X}\r\n".encode("latin1") + chunk + b"\r\n")
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    ## -- Routes
+
+    async def route(self, writer, method, target, body, keepAlive):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = {key : values[-1] for key, values in parse_qs(url.query).items()}
+        if parts == ["schemes"] and method == "GET":
+            await self.sendJSON(writer, 200, qoplots.getAvailableSchemes(self.store), close = not(keepAlive))
+        elif len(parts) == 2 and parts[0] == "schemes" and method == "GET":
+            store = qoplots.getSchemeStore(self.store)
+            if not(parts[1] in store):
+                raise RequestError(404, f"Colour scheme {parts[1]!r} is not recognised")
+            await self.sendJSON(writer, 200, store.get(parts[1]), close = not(keepAlive))
+        elif parts == ["shift"] and method == "POST":
+            await self.shift(writer, body, keepAlive)
+        elif parts == ["simulate"] and method == "POST":
+            await self.simulate(writer, body, query, keepAlive)
+        elif parts and parts[0] in ("schemes", "shift", "simulate"):
+            raise RequestError(405, f"{method} is not supported for /{parts[0]}")
+        else:
+            raise RequestError(404, f"No route for {url.path}")
+
+    def admit(self):
+        if self.pending >= self.maxPending:
+            raise RequestError(503, "Too many requests in progress, retry shortly", ["Retry-After: 1"])
+        self.pending += 1
+
+    async def shift(self, writer, body, keepAlive):
+        try:
+            request = json.loads(body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise RequestError(400, "Body must be JSON")
+        if not(isinstance(request, dict)):
+            raise RequestError(400, "Body must be a JSON object")
+        t, model, severity = request.get("type", "prot"), request.get("model", "meyer"), request.get("severity", 100)
+        if not(isinstance(t, str) and t in rBlind):
+            raise RequestError(400, f"type must be one of {', '.join(rBlind)}")
+        if not(isinstance(model, str) and model in models):
+            raise RequestError(400, f"model must be one of {', '.join(models)}")
+        # bool is an int, but true is not a severity
+        if not(isinstance(severity, (int, float))) or isinstance(severity, bool):
+            raise RequestError(400, "severity must be a number of percent, 0 to 100")
+        if "scheme" in request:
+            if not(isinstance(request["scheme"], str)):
+                raise RequestError(400, "scheme must be a name")
+            store = qoplots.getSchemeStore(self.store)
+            if not(request["scheme"] in store):
+                raise RequestError(404, f"Colour scheme {request['scheme']!r} is not recognised")
+            colours = list(qoplots.loadScheme(request["scheme"], store = self.store))
+        else:
+            colours = request.get("colours")
+        if not(isinstance(colours, list)) or not(all(isinstance(col, str) for col in colours)):
+            raise RequestError(400, "Give a \"scheme\" name or a list of hex \"colours\"")
+        job = {"colours" : colours, "type" : t, "severity" : percentSeverity(severity), "model" : model}
+        ok, result = await self.batcher.submit(job)
+        if not(ok):
+            raise RequestError(400, result)
+        await self.sendJSON(writer, 200, {"colours" : result}, close = not(keepAlive))
+
+    async def simulate(self, writer, body, query, keepAlive):
+        t = query.get("type", "prot")
+        if not(t in rBlind):
+            raise RequestError(400, f"Unrecognised type {t}")
+        if not(body.startswith(b"\x89PNG")):
+            raise RequestError(400, "Body must be a PNG image")
+        p = percentSeverity(query.get("severity", 100))
+        if "lut" in query and not(query["lut"] in lutSizes):
+            raise RequestError(400, f"lut must be one of {', '.join(lutSizes)}")
+        lutSize = int(query["lut"]) if "lut" in query else None
+        with tempfile.TemporaryDirectory() as directory:
+            src, dst = os.path.join(directory, "in.png"), os.path.join(directory, "out.png")
+            try:
+                with open(src, "wb") as source:
+                    source.write(body)
+                del body
+                await asyncio.get_running_loop().run_in_executor(self.pool, simulatePNG, src, dst, t, p, lutSize)
+            except ValueError as error:
+                raise RequestError(400, str(error))
+            await self.sendFileChunked(writer, dst, "image/png", close = not(keepAlive))
+
+async def serve(host = "127.0.0.1", port = 8765, unix = None, **options):
+    service = SimService(**options)
+    if unix:
+        server = await asyncio.start_unix_server(service.handle, path = unix)
+        where = unix
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        where = f"http://{host}:{port}"
+    print(f"Serving on {where}", file = sys.stderr, flush = True)
+    # Stop cleanly on SIGTERM too, so the pool's workers are shut down rather than orphaned
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        service.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Serve scheme lookup, scheme shifting and image simulation over HTTP.")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--unix", help = "Listen on this Unix socket instead of TCP")
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "Worker processes (default: one per CPU)")
+    parser.add_argument("--max-pending", type = int, default = 256, help = "Requests in progress before answering 503")
+    parser.add_argument("--batch-size", type = int, default = 64)
+    parser.add_argument("--batch-delay", type = float, default = 0.002, help = "Seconds to wait while collecting a batch")
+    parser.add_argument("--store", help = "Scheme JSON or ingested palette store (.npy) to serve (default: colourSchemes.json)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, workers = args.workers, maxPending = args.max_pending,
+                          batchSize = args.batch_size, batchDelay = args.batch_delay, store = args.store))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import sys
+import time
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from colourCore import hexToRGB, blindSimulate, percentSeverity
+from catalogue import visions, selectSchemes
+
+## -- Swatch Layout
+## A card is the swatch block the app shows for one scheme: the background with the
+## foreground, background and six accents on top, each outlined in the foreground colour.
+## Sheets tile cards in a grid, so every card shares one template and only the colours,
+## offsets and label change between them.
+
+class SwatchLayout():
+    def __init__(self, swatchSize = 50, gap = 10, radius = 10, stroke = 2, columns = 4, swatches = 8,
+                 sheetColumns = 4, margin = 10, labels = False, labelSize = 14):
+        self.swatchSize = swatchSize
+        self.gap = gap
+        self.radius = radius
+        self.stroke = stroke
+        self.columns = columns
+        self.swatches = swatches
+        self.sheetColumns = sheetColumns
+        self.margin = margin
+        self.labels = labels
+        self.labelSize = labelSize
+
+    @property
+    def rows(self):
+        return -(-self.swatches // self.columns)
+
+    @property
+    def labelHeight(self):
+        return self.labelSize + self.gap if self.labels else 0
+
+    @property
+    def cardWidth(self):
+        return self.columns * (self.swatchSize + self.gap) + self.gap
+
+    @property
+    def cardHeight(self):
+        return self.rows * (self.swatchSize + self.gap) + self.gap + self.labelHeight
+
+    def sheetSize(self, nCards):
+        sheetRows = -(-nCards // self.sheetColumns)
+        width = self.sheetColumns * (self.cardWidth + self.margin) + self.margin
+        height = sheetRows * (self.cardHeight + self.margin) + self.margin
+        return width, height
+
+    def offset(self, i):
+        return (self.margin + (i % self.sheetColumns) * (self.cardWidth + self.margin),
+                self.margin + (i // self.sheetColumns) * (self.cardHeight + self.margin))
+
+    def cardTemplate(self):
+        """Format string for one card: {0} background, {1} outline, {2}... swatch colours,
+        {x} {y} its offset and {label} its caption."""
+        parts = ['<g transform="translate({x},{y})">',
+                 f'<rect width="{self.cardWidth}" height="{self.cardHeight}" rx="{self.radius}" fill="{{0}}"/>']
+        step = self.swatchSize + self.gap
+        for i in range(self.swatches):
+            parts.append(
+                f'<rect x="{step * (i % self.columns) + self.gap}" y="{step * (i // self.columns) + self.gap + self.labelHeight}" '
+                f'width="{self.swatchSize}" height="{self.swatchSize}" rx="{self.radius}" '
+                f'fill="{{{i + 2}}}" stroke="{{1}}" stroke-width="{self.stroke}"/>')
+        if self.labels:
+            parts.append(f'<text x="{self.gap}" y="{self.gap + self.labelSize}" font-size="{self.labelSize}" '
+                         f'font-family="sans-serif" fill="{{1}}">{{label}}</text>')
+        parts.append('</g>\n')
+        return "".join(parts)
+
+defaultLayout = SwatchLayout()
+
+## -- Colour Formatting
+
+hexTable = np.array([f"{i:02X}" for i in range(256)], dtype = object)
+
+def hexColours(rgb):
+    """'#RRGGBB' strings for rgb colours of shape (..., 3) in [0, 1], as an object array of shape (...)."""
+    rgb = np.rint(np.clip(np.asarray(rgb, dtype = np.float64), 0, 1) * 255).astype(np.intp)
+    return "#" + hexTable[rgb[..., 0]] + hexTable[rgb[..., 1]] + hexTable[rgb[..., 2]]
+
+def schemeArray(theme):
+    """(10, 3) rgb array for a scheme given as hex strings and/or rgb triples."""
+    return np.array([hexToRGB(col) if type(col) == str else tuple(col) for col in theme], dtype = np.float64)
+
+## -- Rendering
+
+def svgHeader(width, height):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n')
+
+svgFooter = "</svg>"
+
+def renderCards(colours, labels = None, layout = defaultLayout, start = 0):
+    """SVG groups for cards of `colours` (n, 10, 3), placed from grid position `start` onward."""
+    hexes = hexColours(np.asarray(colours)[:, :layout.swatches]).tolist()
+    labels = [""] * len(hexes) if labels is None else [escape(label) for label in labels]
+    template = layout.cardTemplate()
+    cards = []
+    for i, (card, label) in enumerate(zip(hexes, labels), start):
+        x, y = layout.offset(i)
+        # {0} is the background and {1} the outline, which is the foreground colour
+        cards.append(template.format(card[1], card[0], *card, x = x, y = y, label = label))
+    return cards
+
+def renderSheet(colours, labels = None, layout = None):
+    """A single SVG tiling a card for each scheme in `colours` (n, 10, 3)."""
+    layout = layout or SwatchLayout(labels = labels is not None)
+    return "".join([svgHeader(*layout.sheetSize(len(colours)))] + renderCards(colours, labels, layout) + [svgFooter])
+
+def renderSwatches(colours, labels = None, layout = None):
+    """One standalone SVG per scheme in `colours` (n, 10, 3), rendered in a single pass."""
+    layout = layout or SwatchLayout(sheetColumns = 1, margin = 0, labels = labels is not None)
+    header = svgHeader(layout.cardWidth, layout.cardHeight)
+    return [header + card + svgFooter for card in renderCards(colours, labels, layout)]
+
+def themeToSVG(theme):
+    return renderSwatches(schemeArray(theme)[None])[0]
+
+## -- Contact Sheets
+
+def visionColours(colours, visions, severity = 100):
+    """Stack `colours` (n, 10, 3) as seen in each of `visions`, scheme-major: (n * len(visions), 10, 3)."""
+    colours = np.asarray(colours, dtype = np.float64)
+    return np.stack([colours if v == "normal" else blindSimulate(colours, v, severity) for v in visions], axis = 1).reshape(-1, *colours.shape[1:])
+
+def writeSheet(out, colours, labels = None, layout = None, visions = ("normal",), severity = 100, chunkSize = 64):
+    """Stream a contact sheet of `colours` (n, 10, 3) in each of `visions` to the path or file `out`.
+
+    Schemes run down the rows and visions across the columns. Only `chunkSize` schemes are
+    simulated and formatted at a time, so `colours` may be a memmap of the whole catalogue.
+    """
+    visions = list(visions)
+    layout = layout or SwatchLayout(sheetColumns = len(visions), labels = labels is not None)
+    nCards = len(colours) * len(visions)
+    ownFile = isinstance(out, str)
+    outFile = open(out, "w") if ownFile else out
+    try:
+        outFile.write(svgHeader(*layout.sheetSize(nCards)))
+        for start in range(0, len(colours), chunkSize):
+            chunk = visionColours(colours[start : start + chunkSize], visions, severity)
+            chunkLabels = None
+            if labels is not None:
+                chunkLabels = [f"{name} ({v})" for name in labels[start : start + chunkSize] for v in visions]
+            outFile.writelines(renderCards(chunk, chunkLabels, layout, start * len(visions)))
+        outFile.write(svgFooter)
+    finally:
+        if ownFile:
+            outFile.close()
+    return nCards
+
+def writeCatalogue(out, visions = visions, severity = 100, schemes = None, labels = True, store = None, **kwargs):
+    """Contact sheet of every scheme in `store` (default: colourSchemes.json), or just `schemes`, in each vision."""
+    import qoplots
+    store = qoplots.getSchemeStore(store)
+    names = selectSchemes(store, schemes)
+    colours = store.colours[[store.index(name) for name in names]]
+    return writeSheet(out, colours, names if labels else None, visions = visions, severity = severity, **kwargs)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Write an SVG contact sheet of colour scheme swatches under each type of colour blindness.")
+    parser.add_argument("-o", "--out", default = "schemes.svg", help = "Output SVG path, - for stdout")
+    parser.add_argument("-v", "--visions", nargs = "+", default = list(visions), choices = visions)
+    parser.add_argument("-s", "--severity", type = percentSeverity, default = 100, help = "Severity in percent, 0 to 100")
+    parser.add_argument("--schemes", nargs = "+", help = "Only include these schemes")
+    parser.add_argument("--swatch", type = int, default = 50, help = "Swatch size in px")
+    parser.add_argument("--no-labels", action = "store_true")
+    parser.add_argument("--store", help = "Scheme JSON or ingested palette store (.npy) to read (default: colourSchemes.json)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    layout = SwatchLayout(swatchSize = args.swatch, radius = max(args.swatch // 5, 1), sheetColumns = len(args.visions), labels = not(args.no_labels))
+    out = sys.stdout if args.out == "-" else args.out
+    nCards = writeCatalogue(out, args.visions, args.severity, args.schemes, not(args.no_labels), store = args.store, layout = layout)
+    print(f"Wrote {nCards} swatches in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
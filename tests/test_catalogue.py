@@ -0,0 +1,36 @@
+import csv
+import json
+
+import pytest
+
+import qoplots
+from catalogue import selectSchemes, streamChunks, writeReport
+
+## -- Catalogue Runs
+
+def testSelectSchemes():
+    store = qoplots.getSchemeStore()
+    assert selectSchemes(store) == store.sortedNames
+    assert selectSchemes(store, ["TWILIGHT"]) == [store.lookup["twilight"]]
+    with pytest.raises(KeyError):
+        selectSchemes(store, ["no such scheme"])
+
+def pairUp(names, values, offset):
+    return [(name, value + offset) for name, value in zip(names, values)]
+
+def testStreamChunks():
+    names, values = [f"s{i}" for i in range(10)], list(range(10))
+    results = list(streamChunks(pairUp, (names, values), 3, 1, 100))
+    assert sorted(results) == sorted(zip(names, range(100, 110)))
+
+@pytest.mark.parametrize("rank", [True, False])
+def testWriteReport(tmp_path, rank):
+    results = [{"name" : "a", "score" : 2.5}, {"name" : "b", "score" : 1.0}]
+    writeReport(results, str(tmp_path / "report.json"), rank)
+    with open(tmp_path / "report.json") as reportFile:
+        assert json.load(reportFile) == results
+    writeReport(results, str(tmp_path / "report.csv"), rank)
+    with open(tmp_path / "report.csv", newline = "") as reportFile:
+        rows = list(csv.DictReader(reportFile))
+    assert [row["name"] for row in rows] == ["a", "b"]
+    assert [row.get("rank") for row in rows] == (["1", "2"] if rank else [None, None])
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+import qoplots
+from colourCore import rBlind, blindMk, blindMkArray, blindSimulate, colourShift, shiftScheme, smallBatch
+
+## -- Baseline reference
+## The original Colour-based blindMk from colourBlindness.py, unchanged, as the oracle for
+## both engines.
+
+def rgbToXYZ(rgb):
+    r, g, b = rgb
+    if (r > 1 or g > 1 or b > 1):
+        r, g, b = r / 255, g / 255, b / 255
+    x=(0.430574*r+0.341550*g+0.178325*b);
+    y=(0.222015*r+0.706655*g+0.071330*b);
+    z=(0.020183*r+0.129553*g+0.939180*b);
+    return (x, y, z)
+
+def xyzToRGB(xyz):
+    x, y, z = xyz
+    r=( 3.063218*x-1.393325*y-0.475802*z);
+    g=(-0.969243*x+1.875966*y+0.041555*z);
+    b=( 0.067871*x-0.228834*y+1.069251*z);
+    return (r, g, b)
+
+class Colour():
+    def __init__(self, r = None, g = None, b = None):
+        if r == None:
+            r = [0,0,0]
+        if g == None and b == None:
+            self.r, self.g, self.b = r
+        else:
+            self.r = r
+            self.g = g
+            self.b = b
+        self.u, self.v = 0, 0
+        self.x, self.y, self.z = rgbToXYZ([self.r, self.g, self.b])
+    def recalcRGB(self):
+        self.r, self.g, self.b = xyzToRGB((self.x, self.y, self.z))
+
+def z(v, gamma):
+    return 0 if v <= 0 else 1 if v >= 1 else v ** (1 / gamma)
+
+def baselineBlindMk(rgb, t):
+    gamma=2.2; wx=0.312713; wy=0.329016; wz=0.358271
+    col = Colour(rgb)
+    c = Colour(col.r ** gamma, col.g ** gamma, col.b ** gamma)
+
+    sum_xyz = c.x + c.y + c.z
+    if sum_xyz != 0:
+        c.u = c.x / sum_xyz
+        c.v = c.y / sum_xyz
+    nx = wx * c.y / wy
+    nz = wz * c.y / wy
+    clm = 0
+    s = Colour()
+    d = Colour()
+    d.y = 0
+    if c.u < rBlind[t]['cpu']:
+        clm = (rBlind[t]['cpv'] - c.v) / (rBlind[t]['cpu'] - c.u)
+    else:
+        clm = (c.v - rBlind[t]['cpv']) / (c.u - rBlind[t]['cpu'])
+
+    clyi = c.v - c.u * clm
+    d.u = (rBlind[t]['ayi'] - clyi) / (clm - rBlind[t]['am'])
+    d.v = (clm * d.u) + clyi
+
+    s.x = d.u * c.y / d.v
+    s.y = c.y
+    s.z = (1 - (d.u + d.v)) * c.y / d.v
+    s.recalcRGB()
+
+    d.x = nx - s.x
+    d.z = nz - s.z
+    d.recalcRGB()
+
+    adjr = 0 if d.r == 0 else ((0 if s.r < 0 else 1) - s.r) / d.r
+    adjg = 0 if d.g == 0 else ((0 if s.g < 0 else 1) - s.g) / d.g
+    adjb = 0 if d.b == 0 else ((0 if s.b < 0 else 1) - s.b) / d.b
+
+    adjust = max([ai if 0 <= ai <= 1 else 0 for ai in [adjr, adjg, adjb]])
+
+    s.r = s.r + (adjust * d.r)
+    s.g = s.g + (adjust * d.g)
+    s.b = s.b + (adjust * d.b)
+
+    return [z(s.r, gamma), z(s.g, gamma), z(s.b, gamma)]
+
+## -- Both engines against the baseline
+## Random colours, a seeded sample of 8-bit colours, a coarse grid including the gamut
+## corners, and 8-bit colours a full-grid check found shifted onto the gamut edge, where
+## a last-bit difference in the linear values is amplified to ~3e-8.
+
+edgeColours = np.array([(0, 13, 203), (0, 18, 70), (0, 19, 70), (0, 1, 230), (0, 1, 239), (0, 2, 20), (0, 0, 125), (0, 3, 20)]) / 255
+
+def sampleColours():
+    rng = np.random.default_rng(0)
+    grid = np.stack(np.meshgrid(*[np.linspace(0, 1, 18)] * 3), axis = -1).reshape(-1, 3)
+    return np.concatenate([edgeColours, rng.random((20_000, 3)), rng.integers(0, 256, (20_000, 3)) / 255, grid])
+
+@pytest.mark.parametrize("t", list(rBlind))
+def testBlindMkMatchesBaseline(t):
+    cols = sampleColours().tolist()
+    assert [blindMk(col, t) for col in cols] == [baselineBlindMk(col, t) for col in cols]
+
+@pytest.mark.parametrize("t", list(rBlind))
+def testBlindMkArrayMatchesBaseline(t):
+    cols = sampleColours()
+    expected = np.array([baselineBlindMk(col, t) for col in cols.tolist()])
+    np.testing.assert_allclose(blindMkArray(cols, t), expected, rtol = 0, atol = 1e-9)
+    small = cols[: smallBatch]
+    np.testing.assert_allclose(blindMkArray(small, t), expected[: smallBatch], rtol = 0, atol = 1e-9)
+
+@pytest.mark.parametrize("t", list(rBlind))
+def testGamutEdgeMatchesBaseline(t):
+    # Of 200k seeded 8-bit colours, every one with a channel shifted to within 1e-6 of zero
+    cols = np.random.default_rng(2).integers(0, 256, (200_000, 3)) / 255
+    out = blindMkArray(cols, t)
+    edge = out.min(axis = 1) < 1e-6
+    expected = np.array([baselineBlindMk(col, t) for col in cols[edge].tolist()])
+    np.testing.assert_allclose(out[edge], expected, rtol = 0, atol = 1e-9)
+
+@pytest.mark.parametrize("t", list(rBlind))
+def testUint8Input(t):
+    pixels = np.random.default_rng(1).integers(0, 256, (500, 3), dtype = np.uint8)
+    expected = np.array([baselineBlindMk(col, t) for col in (pixels / 255).tolist()])
+    np.testing.assert_allclose(blindMkArray(pixels, t), expected, rtol = 0, atol = 1e-9)
+
+@pytest.mark.parametrize("p", [0, 0.4, 1, 35, 100])
+def testColourShiftMatchesBlindSimulate(p):
+    for col in sampleColours()[:200].tolist():
+        np.testing.assert_allclose(colourShift(col, "deut", p), blindSimulate([col], "deut", p)[0], rtol = 0, atol = 1e-9)
+
+def testShiftSchemeMatchesScalar():
+    scheme = list(qoplots.loadScheme("twilight"))
+    for t in rBlind:
+        expected = [colourShift(qoplots.hexToRGBTuple(col), t, 70) for col in scheme]
+        np.testing.assert_allclose(shiftScheme(scheme, t, 70), expected, rtol = 0, atol = 1e-9)
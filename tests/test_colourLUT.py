@@ -0,0 +1,56 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from colourCore import rBlind, blindMkArray
+from colourLUT import buildLUT, loadLUT, loadedLUTs, lutPath, simulateLUT
+
+## -- Lookup tables
+## Tables are built into pytest's tmp_path.
+
+@pytest.mark.parametrize("size", [-1, 0, 1])
+def testRejectsTooFewLevels(tmp_path, size):
+    with pytest.raises(ValueError):
+        loadLUT("prot", size, str(tmp_path))
+    with pytest.raises(ValueError):
+        buildLUT("prot", size)
+    assert os.listdir(tmp_path) == []
+
+def testConcurrentLoadsSeeWholeTables(tmp_path):
+    tables, errors = [], []
+    def run():
+        try:
+            tables.append(loadLUT("deut", 17, str(tmp_path), rebuild = True))
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target = run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    loadedLUTs.clear()
+    assert errors == []
+    assert os.listdir(tmp_path) == [os.path.basename(lutPath("deut", 17))]
+    np.testing.assert_array_equal(np.load(lutPath("deut", 17, str(tmp_path))), buildLUT("deut", 17))
+
+# Bounds in 8-bit levels from the README: mean error and the 99th percentile of each colour's worst channel
+interpolatedBounds = {33 : (0.2, 8), 65 : (0.1, 4)}
+
+@pytest.mark.parametrize("size", sorted(interpolatedBounds))
+@pytest.mark.parametrize("t", list(rBlind))
+def testInterpolatedTableAccuracy(tmp_path, t, size):
+    rgb = np.random.default_rng(3).integers(0, 256, (20_000, 3)) / 255
+    errors = np.abs(simulateLUT(rgb, t, 100, size, str(tmp_path)) - blindMkArray(rgb, t)) * 255
+    loadedLUTs.clear()
+    meanBound, percentileBound = interpolatedBounds[size]
+    assert errors.mean() < meanBound
+    assert np.percentile(errors.max(axis = 1), 99) < percentileBound
+
+def testFullTableAccuracy(tmp_path):
+    rgb = np.random.default_rng(4).integers(0, 256, (20_000, 3), dtype = np.uint8)
+    errors = np.abs(simulateLUT(rgb, "deut", 100, 256, str(tmp_path)) - blindMkArray(rgb, "deut")) * 255
+    loadedLUTs.clear()
+    # Only the rounding to 8 bits
+    assert errors.max() <= 0.5 + 1e-6
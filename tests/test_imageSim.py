@@ -0,0 +1,123 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from imageSim import PNGReader, PNGWriter, pngSignature, simulateImage
+
+## -- PNG round trips
+## Images are filtered here byte by byte, straight from the PNG specification, with a
+## chosen filter per row, then decoded with PNGReader.
+
+def paeth(a, b, c):
+    pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+    return a if (pa <= pb and pa <= pc) else b if pb <= pc else c
+
+def filterRow(filterType, row, prev, bpp):
+    out = []
+    for i, x in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        predicted = [0, a, b, (a + b) // 2, paeth(a, b, c)][filterType]
+        out.append((x - predicted) & 0xFF)
+    return out
+
+def writeFilteredPNG(path, pixels, filters, headerHeight = None):
+    height, width, channels = pixels.shape
+    prev = [0] * (width * channels)
+    raw = bytearray()
+    for row, filterType in zip(pixels.reshape(height, -1).tolist(), filters):
+        raw.append(filterType)
+        raw += bytes(filterRow(filterType, row, prev, channels))
+        prev = row
+    def chunk(kind, payload):
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(payload, zlib.crc32(kind)))
+    colourType = {3 : 2, 4 : 6}[channels]
+    with open(path, "wb") as pngFile:
+        pngFile.write(pngSignature)
+        pngFile.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, headerHeight or height, 8, colourType, 0, 0, 0)))
+        pngFile.write(chunk(b"IDAT", zlib.compress(bytes(raw))))
+        pngFile.write(chunk(b"IEND", b""))
+
+def readPNG(path, rows = 7):
+    reader = PNGReader(path)
+    try:
+        return np.concatenate(list(reader.bands(rows)))
+    finally:
+        reader.close()
+
+def samplePixels(height = 41, width = 29, channels = 3, seed = 0):
+    # Smooth gradients plus noise, so the predictors are exercised near and across 0/255
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0 : height, 0 : width]
+    base = np.stack([x * 9, y * 6, (x + y) * 4, 255 - x * 3][: channels], axis = -1)
+    return ((base + rng.integers(-20, 21, base.shape)) % 256).astype(np.uint8)
+
+@pytest.mark.parametrize("channels", [3, 4])
+@pytest.mark.parametrize("filterType", [0, 1, 2, 3, 4])
+def testSingleFilter(tmp_path, filterType, channels):
+    pixels = samplePixels(channels = channels)
+    path = str(tmp_path / "image.png")
+    writeFilteredPNG(path, pixels, [filterType] * len(pixels))
+    np.testing.assert_array_equal(readPNG(path), pixels)
+
+@pytest.mark.parametrize("channels", [3, 4])
+def testMixedFilters(tmp_path, channels):
+    pixels = samplePixels(height = 60, channels = channels, seed = 1)
+    filters = np.random.default_rng(2).integers(0, 5, len(pixels)).tolist()
+    path = str(tmp_path / "image.png")
+    writeFilteredPNG(path, pixels, filters)
+    np.testing.assert_array_equal(readPNG(path), pixels)
+    # Batches of a few rows, so diagonals restart on each batch boundary
+    reader = PNGReader(path)
+    lines = np.stack(list(reader.scanlines(batchBytes = 1)))
+    reader.close()
+    np.testing.assert_array_equal(lines.reshape(pixels.shape), pixels)
+
+def testWriterRoundTrip(tmp_path):
+    pixels = samplePixels(height = 50, width = 33)
+    path = str(tmp_path / "image.png")
+    writer = PNGWriter(path, 33, 50, 3)
+    for i in range(0, 50, 16):
+        writer.write(pixels[i : i + 16])
+    writer.close()
+    np.testing.assert_array_equal(readPNG(path), pixels)
+
+def testPillowRoundTrip(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    pixels = samplePixels(height = 64, width = 48, channels = 4, seed = 3)
+    path = str(tmp_path / "image.png")
+    Image.fromarray(pixels).save(path)
+    np.testing.assert_array_equal(readPNG(path), pixels)
+
+## -- Incomplete images
+## Both must fail with ValueError, which simService answers with 400, and leave no output.
+
+def testTruncatedFile(tmp_path):
+    pixels = samplePixels(height = 3000, width = 40, seed = 4)
+    path, dst = str(tmp_path / "image.png"), str(tmp_path / "out.png")
+    writer = PNGWriter(path, 40, 3000, 3, chunkSize = 4096)
+    writer.write(pixels)
+    writer.close()
+    with open(path, "rb") as pngFile:
+        data = pngFile.read()
+    with open(path, "wb") as pngFile:
+        pngFile.write(data[: len(data) // 2])
+    with pytest.raises(ValueError, match = "truncated"):
+        readPNG(path)
+    with pytest.raises(ValueError):
+        simulateImage(path, dst, "prot")
+    assert not(os.path.exists(dst))
+
+def testShortImageData(tmp_path):
+    pixels = samplePixels(height = 20)
+    path, dst = str(tmp_path / "image.png"), str(tmp_path / "out.png")
+    writeFilteredPNG(path, pixels, [4] * len(pixels), headerHeight = 30)
+    with pytest.raises(ValueError, match = "20 rows"):
+        readPNG(path)
+    with pytest.raises(ValueError):
+        simulateImage(path, dst, "deut")
+    assert not(os.path.exists(dst))
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+import matplotlib
+import numpy as np
+import pytest
+
+import qoplots
+from paletteStore import PaletteStore, ingest, storePaths
+
+## -- Ingest and the store
+## Small JSON libraries written to pytest's tmp_path, with names deliberately out of order.
+
+def writeLibrary(path, names):
+    rng = np.random.default_rng(len(names))
+    schemes = {}
+    for name in names:
+        hexes = ["#{:02X}{:02X}{:02X}".format(*rgb) for rgb in rng.integers(0, 256, (8, 3)).tolist()]
+        schemes[name] = dict(zip(qoplots.colourNames, hexes))
+    with open(path, "w") as libraryFile:
+        json.dump(schemes, libraryFile)
+    return schemes
+
+def testSortedNames(tmp_path):
+    names = ["Zest", "amber", "Moss", "Dusk"]
+    schemes = writeLibrary(tmp_path / "library.json", names)
+    ingest(str(tmp_path / "library.json"), str(tmp_path / "store"))
+    store = PaletteStore(str(tmp_path / "store"))
+    assert store.names == names
+    assert store.sortedNames == sorted(names)
+    for name in store.sortedNames:
+        assert store.get(name)["Accent1"] == schemes[name]["Accent1"]
+        assert store.names[store.index(name)] == name
+
+def testConcurrentIngest(tmp_path):
+    names = [f"Scheme {i}" for i in range(2000)]
+    writeLibrary(tmp_path / "library.json", names)
+    errors = []
+    def run():
+        try:
+            ingest(str(tmp_path / "library.json"), str(tmp_path / "store"), chunkSize = 64)
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target = run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    store = PaletteStore(str(tmp_path / "store"))
+    assert store.names == names
+    assert store.colours.shape == (len(names), len(qoplots.colourNames), 3)
+    assert sorted(os.listdir(tmp_path)) == sorted(["library.json"] + [os.path.basename(p) for p in storePaths(str(tmp_path / "store"))])
+
+def testConcurrentGetSchemeStore(tmp_path):
+    path = str(tmp_path / "library.json")
+    writeLibrary(path, [f"Scheme {i}" for i in range(500)])
+    stores = []
+    def run():
+        stores.append(qoplots.getSchemeStore(path))
+    threads = [threading.Thread(target = run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(stores) == 4 and all(store is stores[0] for store in stores)
+    assert len(stores[0]) == 500
+
+def testSchemesFromIngestedStore(tmp_path):
+    schemes = writeLibrary(tmp_path / "library.json", ["Ember", "moss"])
+    ingest(str(tmp_path / "library.json"), str(tmp_path / "library"))
+    path = str(tmp_path / "library.npy")
+    assert qoplots.getAvailableSchemes(store = path) == ["Ember", "moss"]
+    assert qoplots.loadScheme("ember", store = path).Accent2 == schemes["Ember"]["Accent2"]
+    # init sets rcParams, so keep them to this test
+    with matplotlib.rc_context():
+        assert qoplots.init(scheme = "Moss", store = path).Accent1 == schemes["moss"]["Accent1"]
+    try:
+        qoplots.useSchemeStore(path)
+        assert qoplots.getAvailableSchemes() == ["Ember", "moss"]
+        assert qoplots.loadScheme("moss").Accent6 == schemes["moss"]["Accent6"]
+    finally:
+        qoplots.useSchemeStore()
+    assert "twilight" in qoplots.getAvailableSchemes()
+
+def writeLines(path, lines):
+    with open(path, "w") as sourceFile:
+        sourceFile.write("\n".join(lines) + "\n")
+
+def testBadJSONLLineIsSkipped(tmp_path):
+    hexes = ["#102030"] * 8
+    writeLines(tmp_path / "library.jsonl", [
+        json.dumps({"name" : "first", "colours" : hexes}),
+        '{"name": "broken", "colours": [',
+        json.dumps({"name" : "last", "colours" : hexes}),
+    ])
+    source, base = str(tmp_path / "library.jsonl"), str(tmp_path / "store")
+    assert ingest(source, base) == (2, 1)
+    assert PaletteStore(base).names == ["first", "last"]
+    with pytest.raises(ValueError, match = "line 2"):
+        ingest(source, base, skipInvalid = False)
+    # The failed strict run leaves the earlier store and no temporaries behind
+    assert PaletteStore(base).names == ["first", "last"]
+    assert sorted(os.listdir(tmp_path)) == sorted(["library.jsonl", "store.npy", "store.names.json"])
+
+@pytest.mark.parametrize("skipInvalid", [True, False])
+def testHeaderlessCSV(tmp_path, skipInvalid):
+    writeLines(tmp_path / "library.csv", ["Ember," + ",".join(["#102030"] * 8), "Moss," + ",".join(["#405060"] * 8)])
+    with pytest.raises(ValueError, match = "name"):
+        ingest(str(tmp_path / "library.csv"), str(tmp_path / "store"), skipInvalid = skipInvalid)
+    assert os.listdir(tmp_path) == ["library.csv"]
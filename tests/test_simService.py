@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from colourCore import hexToRGB, rgbToHex, blindMkArray
+from simService import SimService, shiftBatch
+
+## -- Batched shifts
+## Jobs sharing a model, type and severity are simulated together; a malformed job must
+## fail on its own and leave the rest of its group intact.
+
+def job(colours, model = "meyer", t = "prot", severity = 100):
+    return {"colours" : colours, "model" : model, "type" : t, "severity" : severity}
+
+def testBadJobFailsAlone():
+    jobs = [job(["#FF0000", "#00FF00"]), job(["#GG0000"]), job([]), job(["#0000FF"]), job([None])]
+    results = shiftBatch(jobs)
+    assert [ok for ok, _ in results] == [True, False, True, True, False]
+    assert results[2][1] == []
+    for k in (0, 3):
+        # At full severity Meyer's model is blindMk itself
+        expected = np.clip(blindMkArray(np.array([hexToRGB(col) for col in jobs[k]["colours"]]), "prot"), 0, 1)
+        assert results[k][1] == [rgbToHex(tuple(col)) for col in expected.tolist()]
+        assert results[k][1] != jobs[k]["colours"]
+
+def testBadModelFailsItsGroupOnly():
+    results = shiftBatch([job(["#0000FF"], model = "unknown"), job(["#0000FF"])])
+    assert results[0][0] is False and "unknown" in results[0][1]
+    assert results[1][0] is True
+
+## -- Requests
+## Raw HTTP/1.1 requests to a service listening on a Unix socket in the test's directory.
+
+@pytest.fixture(scope = "module")
+def service():
+    service = SimService(workers = 1)
+    yield service
+    service.close()
+
+def send(service, path, raw):
+    async def exchange():
+        server = await asyncio.start_unix_server(service.handle, path = path)
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(raw)
+            await writer.drain()
+            # Bounded, so a connection that never closes fails the test rather than hanging it
+            response = await asyncio.wait_for(reader.read(), 60)
+            writer.close()
+        return response
+    head, _, body = asyncio.run(exchange()).partition(b"\r\n\r\n")
+    return int(head.split()[1]), body
+
+def post(service, tmp_path, target, body, headers = ()):
+    head = [f"POST {target} HTTP/1.1", f"Content-Length: {len(body)}", "Connection: close"] + list(headers)
+    return send(service, str(tmp_path / "sim.sock"), ("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+def testFirstJobClosesItsConnection(tmp_path):
+    # The first job starts no workers, so none inherits this connection and holds it open
+    service = SimService(workers = 1)
+    try:
+        status, body = post(service, tmp_path, "/shift", json.dumps({"colours" : ["#FF0000"]}).encode())
+    finally:
+        service.close()
+    expected = np.clip(blindMkArray(np.array([[1.0, 0, 0]]), "prot"), 0, 1)
+    assert status == 200 and json.loads(body)["colours"] == [rgbToHex(tuple(expected[0].tolist()))]
+
+@pytest.mark.parametrize("lut", ["1", "2", "7", "100000", "abc", "-65"])
+def testRejectsUnlistedLUTSizes(service, tmp_path, lut):
+    status, body = post(service, tmp_path, f"/simulate?type=prot&lut={lut}", b"\x89PNG")
+    assert status == 400 and "lut" in json.loads(body)["error"]
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"twilight"', b"3", b"null", b'{"colours": ["#FF0000"], "severity": null}',
+                                  b'{"colours": ["#FF0000"], "severity": "high"}', b'{"colours": ["#FF0000"], "severity": true}',
+                                  b'{"colours": ["#FF0000"], "severity": 500}', b'{"colours": ["#FF0000"], "type": ["prot"]}',
+                                  b'{"colours": ["#FF0000"], "model": "nope"}', b'{"scheme": 7}', b'{"colours": "#FF0000"}', b"\xff\xfe"])
+def testRejectsMalformedShiftBodies(service, tmp_path, body):
+    status, response = post(service, tmp_path, "/shift", body)
+    assert status == 400 and "error" in json.loads(response)
+
+def testJSONBodyLimit(service, tmp_path):
+    # Refused from the Content-Length alone, so the body is never sent
+    head = f"POST /shift HTTP/1.1\r\nContent-Length: {service.maxJSONBody + 1}\r\n\r\n".encode()
+    assert send(service, str(tmp_path / "sim.sock"), head)[0] == 413
+
+def testAdmitsBeforeReadingBody(tmp_path):
+    # With no room left, the request is turned away without its body being read
+    service = SimService(workers = 1, maxPending = 0)
+    try:
+        head = b"POST /shift HTTP/1.1\r\nContent-Length: 1000000\r\n\r\n"
+        status, response = send(service, str(tmp_path / "sim.sock"), head)
+    finally:
+        service.close()
+    assert status == 503
+
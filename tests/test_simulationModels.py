@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from colourCore import rBlind, blindSimulate
+from simulationModels import (models, simulate, rgbToLMSMatrix, missingCone, vienotMatrix, brettelMatrices,
+                              machadoMatrix, machadoTables, spectrumLMS, brettelAnchors, lmsToRGBMatrix)
+
+## -- Matrix models
+## Checked against the properties each paper builds its kernel from, rather than against
+## a second implementation: which colours a dichromat plane keeps, which it collapses.
+
+types = list(rBlind)
+
+def sampleColours(n = 500):
+    return np.random.default_rng(5).random((n, 3))
+
+def confusionPartner(lin, t):
+    # Linear rgb colours that differ from `lin` only in the missing cone's response
+    lms = lin @ rgbToLMSMatrix.T
+    lms[:, missingCone[t]] *= 1.5
+    return lms @ lmsToRGBMatrix.T
+
+@pytest.mark.parametrize("t", types)
+def testVienotIsAProjection(t):
+    m = vienotMatrix(t)
+    np.testing.assert_allclose(m @ m, m, atol = 1e-12)
+    np.testing.assert_allclose(m @ np.ones(3), np.ones(3), atol = 1e-12)
+    anchor = np.array([1.0, 0, 0]) if t == "trit" else np.array([0, 0, 1.0])
+    np.testing.assert_allclose(m @ anchor, anchor, atol = 1e-12)
+
+@pytest.mark.parametrize("t", types)
+def testVienotCollapsesConfusionLines(t):
+    lin = sampleColours()
+    m = vienotMatrix(t)
+    np.testing.assert_allclose(lin @ m.T, confusionPartner(lin, t) @ m.T, atol = 1e-12)
+
+@pytest.mark.parametrize("t", types)
+def testBrettelHalfPlanes(t):
+    matrices, separation = brettelMatrices(t)
+    lmsToRGB = np.linalg.inv(rgbToLMSMatrix)
+    for m, wavelength in zip(matrices, brettelAnchors[t]):
+        np.testing.assert_allclose(m @ m, m, atol = 1e-12)
+        np.testing.assert_allclose(m @ np.ones(3), np.ones(3), atol = 1e-12)
+        anchor = lmsToRGB @ spectrumLMS(wavelength)
+        np.testing.assert_allclose(m @ anchor, anchor, atol = 1e-12)
+    # The first anchor lies on the positive side of the separating plane
+    assert separation @ (lmsToRGB @ spectrumLMS(brettelAnchors[t][0])) > 0
+    # Confusion partners stay on the same side, so they collapse to one colour too
+    lin = sampleColours()
+    sides = lin @ separation >= 0
+    np.testing.assert_array_equal(sides, confusionPartner(lin, t) @ separation >= 0)
+
+@pytest.mark.parametrize("t", types)
+def testMachadoTables(t):
+    np.testing.assert_array_equal(machadoMatrix(t, 0), np.eye(3))
+    for p, m in machadoTables[t].items():
+        np.testing.assert_array_equal(machadoMatrix(t, p), m)
+        # Each published matrix keeps white to the precision it is printed with
+        np.testing.assert_allclose(m.sum(axis = 1), 1, atol = 5e-6)
+    np.testing.assert_allclose(machadoMatrix(t, 0.25), (machadoTables[t][0.2] + machadoTables[t][0.3]) / 2, atol = 1e-15)
+
+@pytest.mark.parametrize("model", list(models))
+@pytest.mark.parametrize("t", types)
+def testSimulate(model, t):
+    rgb = sampleColours()
+    np.testing.assert_allclose(simulate(rgb, model, t, 0), rgb, atol = 1e-9)
+    sim = simulate(rgb, model, t, 100)
+    assert sim.shape == rgb.shape and sim.min() >= 0 and sim.max() <= 1
+    if model != "meyer":
+        # The kernels keep neutral colours; Meyer's white point is not sRGB's, so it tints them slightly
+        np.testing.assert_allclose(simulate(np.full((2, 3), 0.5), model, t, 100), 0.5, atol = 1e-3)
+    pixels = (rgb.reshape(20, 25, 3) * 255).round().astype(np.uint8)
+    np.testing.assert_allclose(simulate(pixels, model, t, 60), simulate(pixels / 255, model, t, 60), atol = 1e-12)
+
+def testMeyerIsBlindSimulate():
+    rgb = sampleColours()
+    for t in types:
+        np.testing.assert_array_equal(simulate(rgb, "meyer", t, 70), blindSimulate(rgb, t, 70))
+
+def testUnknownModel():
+    with pytest.raises(ValueError):
+        simulate(sampleColours(), "ishihara")
+    with pytest.raises(ValueError):
+        simulate(sampleColours(), "vienot", "achro")
@@ -0,0 +1,199 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+## -- Stage Timings
+## Code marks its stages with `with stage("plot"):` or `@timed("plot")`. A `Recorder`
+## bound to the current thread with `record()` collects each run's stage durations and
+## keeps the last `window` runs for rolling statistics. With no recorder bound, or one that
+## is switched off, `stage` hands back a shared do-nothing context, so the marks can stay
+## in place. While no run is recording anywhere, that costs one global lookup.
+##
+## Durations are wall time and include any nested stages. A stage entered several times
+## in one run, such as once per column, is summed.
+
+local = threading.local()
+# Runs recording on any thread; the thread-local lookup is skipped while it is zero
+recording = 0
+recordingLock = threading.Lock()
+
+class IdleStage():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+idle = IdleStage()
+
+class Stage():
+    __slots__ = ("run", "name", "start")
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run[self.name] = self.run.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+def stage(name):
+    """Context manager timing `name` in the current thread's run, if one is being recorded."""
+    if not(recording):
+        return idle
+    run = getattr(local, "run", None)
+    return idle if run is None else Stage(run, name)
+
+def timed(name = None):
+    """Decorator timing every call of a function as stage `name` (default: the function's name)."""
+    def decorate(fn):
+        label = name or fn.__name__
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            run = getattr(local, "run", None) if recording else None
+            if run is None:
+                return fn(*args, **kwargs)
+            with Stage(run, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+## -- Recording
+
+class Recorder():
+    """Stage durations per run, keeping the last `window` runs. Appends each run to `logPath` as a JSON line if given."""
+    def __init__(self, window = 50, enabled = True, logPath = None):
+        self.runs = deque(maxlen = window)
+        self.enabled = enabled
+        self.logPath = logPath
+        self.count = 0
+
+    def record(self, **labels):
+        """A run on the current thread, stored with `labels` (which can be added to until it stops)."""
+        return RecordedRun(self, labels)
+
+    def finish(self, stages, labels, total):
+        self.count += 1
+        run = {"run" : self.count, "time" : time.time(), "total" : total, "stages" : stages, "labels" : labels}
+        self.runs.append(run)
+        if self.logPath:
+            with open(self.logPath, "a") as logFile:
+                logFile.write(json.dumps(run) + "\n")
+        return run
+
+    @property
+    def last(self):
+        return self.runs[-1] if self.runs else None
+
+    def summary(self):
+        """Rolling statistics in milliseconds for each stage, in order of first appearance.
+
+        `runs` counts the runs in the window the stage appeared in; a stage answered from a
+        cache without running is absent from that run rather than counted as zero.
+        """
+        if not(self.runs):
+            return []
+        durations = {"total" : [run["total"] for run in self.runs]}
+        for run in self.runs:
+            for name, seconds in run["stages"].items():
+                durations.setdefault(name, []).append(seconds)
+        last = dict(self.last["stages"], total = self.last["total"])
+        rows = []
+        for name, values in durations.items():
+            ms = np.array(values) * 1e3
+            rows.append({
+                "stage" : name,
+                "last"  : last.get(name, np.nan) * 1e3,
+                "mean"  : float(ms.mean()),
+                "p50"   : float(np.percentile(ms, 50)),
+                "p95"   : float(np.percentile(ms, 95)),
+                "max"   : float(ms.max()),
+                "runs"  : len(ms),
+            })
+        return rows
+
+    def toJSONL(self):
+        return "".join(json.dumps(run) + "\n" for run in self.runs)
+
+    def export(self, path):
+        with open(path, "w") as exportFile:
+            exportFile.write(self.toJSONL())
+
+def loadRuns(path, last = None):
+    """A switched off `Recorder` holding the runs in a JSON lines export or log, or only the `last` of them."""
+    with open(path) as runsFile:
+        runs = [json.loads(line) for line in runsFile if line.strip()]
+    recorder = Recorder(window = last or max(len(runs), 1), enabled = False)
+    recorder.runs.extend(runs)
+    recorder.count = len(runs)
+    return recorder
+
+class RecordedRun():
+    """One run of a `Recorder`, used as a context manager or with `start()` and `stop()`."""
+    __slots__ = ("recorder", "labels", "active", "stages", "begin", "previous")
+
+    def __init__(self, recorder, labels):
+        self.recorder = recorder
+        self.labels = labels
+        self.active = False
+
+    def start(self):
+        global recording
+        self.previous = getattr(local, "run", None)
+        self.active = self.recorder.enabled
+        self.stages = {}
+        local.run = self.stages if self.active else None
+        if self.active:
+            with recordingLock:
+                recording += 1
+        self.begin = time.perf_counter()
+        return self
+
+    def stop(self):
+        global recording
+        local.run = self.previous
+        if self.active:
+            self.active = False
+            with recordingLock:
+                recording -= 1
+            return self.recorder.finish(self.stages, self.labels, time.perf_counter() - self.begin)
+
+    def cancel(self):
+        """Drop a run that will not reach `stop()`, such as a script run that was interrupted, from any thread."""
+        global recording
+        if self.active:
+            self.active = False
+            with recordingLock:
+                recording -= 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Summarise stage timings exported or logged as JSON lines.")
+    parser.add_argument("path", help = "JSON lines file of runs")
+    parser.add_argument("-n", "--last", type = int, help = "Only the last N runs")
+    args = parser.parse_args(argv)
+
+    recorder = loadRuns(args.path, args.last)
+    print(f"{'stage':<20}{'last':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}{'runs':>7}   (ms, {len(recorder.runs)} runs)")
+    for row in recorder.summary():
+        print(f"{row['stage']:<20}" + "".join(f"{row[key]:>10.2f}" for key in ("last", "mean", "p50", "p95", "max")) + f"{row['runs']:>7}")
+
+if __name__ == "__main__":
+    main()